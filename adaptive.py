@@ -0,0 +1,122 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import config
+
+# 延迟基线的平滑系数
+LATENCY_EWMA_ALPHA = 0.1
+# 至少有这么多成功样本后才根据延迟判断是否拥塞
+LATENCY_WARMUP_SAMPLES = 5
+
+
+class AIMDLimit:
+    """
+    单个密钥的自适应并发上限（加性增、乘性减）
+
+    请求成功且延迟平稳时，每完成约一个窗口（当前上限个）的请求上限加1；
+    遇到429、5xx、超时或延迟超过基线的 latency_spike_factor 倍时上限乘以 decrease_factor。
+    一次拥塞后的一个基线延迟内不重复减小，避免同一批在途请求把上限压到最低。
+    """
+
+    def __init__(self, initial: float, min_limit: float, max_limit: float, decrease_factor: float,
+                 latency_spike_factor: float, clock: Callable[[], float] = time.monotonic):
+        self.limit = min(max(initial, min_limit), max_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_spike_factor = latency_spike_factor
+        self.clock = clock
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.samples = 0
+        self._last_decrease = float("-inf")
+
+    def on_success(self, seconds: float):
+        """请求成功"""
+        if (self.samples >= LATENCY_WARMUP_SAMPLES and self.baseline is not None
+                and seconds > self.baseline * self.latency_spike_factor):
+            self.on_congestion()
+            return
+        self.baseline = seconds if self.baseline is None else (
+            (1 - LATENCY_EWMA_ALPHA) * self.baseline + LATENCY_EWMA_ALPHA * seconds)
+        self.samples += 1
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_congestion(self):
+        """限流、服务端错误或超时"""
+        now = self.clock()
+        if now - self._last_decrease < (self.baseline or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+
+class AdaptiveConcurrency:
+    """
+    按API密钥分别控制同时在途的请求数量
+
+    每个密钥有独立的 AIMDLimit，首次使用时创建；选择密钥时调用 try_acquire 占用一个名额，
+    已达上限的密钥不会被选中，请求结束后调用 release 并报告结果。
+    """
+
+    def __init__(self, api_keys: Optional[List[str]] = None, initial: Optional[float] = None, min_limit: Optional[float] = None,
+                 max_limit: Optional[float] = None, decrease_factor: Optional[float] = None,
+                 latency_spike_factor: Optional[float] = None):
+        initial = initial if initial is not None else config.ADAPTIVE_INITIAL_CONCURRENCY
+        min_limit = min_limit if min_limit is not None else config.ADAPTIVE_MIN_CONCURRENCY
+        max_limit = max_limit if max_limit is not None else config.ADAPTIVE_MAX_CONCURRENCY
+        decrease_factor = decrease_factor if decrease_factor is not None else config.ADAPTIVE_DECREASE_FACTOR
+        latency_spike_factor = (latency_spike_factor if latency_spike_factor is not None
+                                else config.ADAPTIVE_LATENCY_SPIKE_FACTOR)
+
+        self._settings = (initial, min_limit, max_limit, decrease_factor, latency_spike_factor)
+        self._condition = threading.Condition()
+        self._limits: Dict[str, AIMDLimit] = {}
+        for api_key in api_keys or []:
+            self._state(api_key)
+
+    def _state(self, api_key: str) -> AIMDLimit:
+        """返回密钥的 AIMDLimit，不存在时创建，调用时必须持有锁"""
+        state = self._limits.get(api_key)
+        if state is None:
+            state = AIMDLimit(*self._settings)
+            self._limits[api_key] = state
+        return state
+
+    def limit(self, api_key: str) -> float:
+        """密钥当前的并发上限"""
+        with self._condition:
+            return self._state(api_key).limit
+
+    def try_acquire(self, api_key: str) -> bool:
+        """
+        尝试占用密钥的一个并发名额，不等待
+
+        Returns:
+            占用成功返回True，已达上限返回False
+        """
+        with self._condition:
+            state = self._state(api_key)
+            if state.in_flight >= max(1, int(state.limit)):
+                return False
+            state.in_flight += 1
+            return True
+
+    def release(self, api_key: str, seconds: float, congested: bool):
+        """
+        释放并发名额并根据结果调整上限
+
+        Args:
+            api_key: 使用的API密钥
+            seconds: 请求耗时
+            congested: 是否遇到限流、服务端错误或超时
+        """
+        with self._condition:
+            state = self._state(api_key)
+            state.in_flight -= 1
+            if congested:
+                state.on_congestion()
+            else:
+                state.on_success(seconds)
+            self._condition.notify_all()
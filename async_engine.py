@@ -0,0 +1,157 @@
+import asyncio
+import config
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from job_journal import JobJournal
+from mouser_api import MouserAPI
+from part_number import canonicalize
+from result_record import PartResult
+
+# 进度回调: (已完成数量, 刚完成的元件型号)
+ProgressCallback = Callable[[int, str], None]
+# 结果回调: (输入中的位置, 该位置的查询结果)
+ResultCallback = Callable[[int, PartResult], None]
+
+
+class AsyncLookupEngine:
+    """
+    并发查询引擎
+
+    在线程池中并发执行 MouserAPI.lookup_components，每次最多合并 batch_size 个型号，
+    并发数量受 max_concurrency 限制，结果按输入顺序返回。
+    同一批次中重复的型号只查询一次，结果复制到每个重复的行。
+    """
+
+    def __init__(self, mouser_api: Optional[MouserAPI] = None, max_concurrency: Optional[int] = None,
+                 batch_size: Optional[int] = None):
+        self.mouser_api = mouser_api if mouser_api is not None else MouserAPI()
+        self.max_concurrency = max(1, max_concurrency if max_concurrency is not None else config.MAX_CONCURRENCY)
+        # 连接池至少要容纳全部查询线程，否则多出的连接无法复用
+        self.mouser_api.reserve_connections(self.max_concurrency)
+        # 每个请求合并查询的型号数量，为1时逐个查询
+        self.batch_size = max(1, batch_size if batch_size is not None else config.MOUSER_BATCH_SIZE)
+
+    async def search_many(self, part_numbers: Iterable[str],
+                          progress_callback: Optional[ProgressCallback] = None,
+                          journal: Optional[JobJournal] = None, job_id: Optional[str] = None,
+                          result_callback: Optional[ResultCallback] = None) -> List[PartResult]:
+        """
+        并发查询多个元件
+
+        Args:
+            part_numbers: 元件型号序列，可以是列表或逐行读取的迭代器
+            progress_callback: 每完成一个元件时调用的进度回调
+            journal: 任务日志，提供时每完成一组就写入日志，并跳过日志中已完成的位置
+            job_id: 任务ID，使用任务日志时必须提供
+            result_callback: 每得到一行结果时调用，用于逐步显示部分结果
+
+        Returns:
+            与输入顺序一致的查询结果列表
+        """
+        loop = asyncio.get_running_loop()
+        # 所有工作协程共享同一个迭代器，输入按需读取，不需要预先全部加载
+        pending = enumerate(part_numbers)
+        results: Dict[int, PartResult] = {}
+        # 每个型号首次出现的位置，重复出现的行只记录下来，最后复用首次的结果
+        first_index: Dict[str, int] = {}
+        duplicates: List[Tuple[int, str]] = []
+        completed = 0
+
+        # 续跑任务时跳过已完成的位置
+        skipped = set()
+        if journal is not None:
+            if job_id is None:
+                raise ValueError("使用任务日志时必须提供任务ID")
+            journal.start_job(job_id)
+            skipped = journal.completed_positions(job_id)
+
+        def next_chunk() -> List[Tuple[int, str]]:
+            """从输入中取出下一组不重复的型号，最多 batch_size 个"""
+            nonlocal completed
+            chunk = []
+            for index, part_number in pending:
+                if index in skipped:
+                    completed += 1
+                    if progress_callback:
+                        progress_callback(completed, part_number)
+                    continue
+                # 写法不同的同一型号（大小写、全角、空格等）只查询一次
+                key = canonicalize(part_number)
+                if key in first_index:
+                    duplicates.append((index, part_number))
+                    continue
+                first_index[key] = index
+                chunk.append((index, part_number))
+                if len(chunk) >= self.batch_size:
+                    break
+            return chunk
+
+        def lookup_chunk(chunk: List[Tuple[int, str]]) -> List[PartResult]:
+            rows = self.mouser_api.lookup_components([part_number for _, part_number in chunk])
+            if journal is not None:
+                journal.record_many(job_id, [(index, row) for (index, _), row in zip(chunk, rows)])
+            return rows
+
+        async def worker(executor: ThreadPoolExecutor):
+            nonlocal completed
+            while True:
+                chunk = next_chunk()
+                if not chunk:
+                    break
+                rows = await loop.run_in_executor(executor, lookup_chunk, chunk)
+                for (index, part_number), row in zip(chunk, rows):
+                    results[index] = row
+                    completed += 1
+                    if result_callback:
+                        result_callback(index, row)
+                    if progress_callback:
+                        progress_callback(completed, part_number)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            await asyncio.gather(*(worker(executor) for _ in range(self.max_concurrency)))
+
+        for index, part_number in duplicates:
+            original = results[first_index[canonicalize(part_number)]]
+            row = original.copy(component=part_number)
+            # 精确匹配时搜索型号就是输入型号，使用这一行自己的写法；相似型号保持不变
+            if original.searched_part == original.component:
+                row.searched_part = part_number
+            results[index] = row
+            completed += 1
+            if result_callback:
+                result_callback(index, results[index])
+            if progress_callback:
+                progress_callback(completed, part_number)
+
+        if journal is not None:
+            journal.record_many(job_id, [(index, results[index]) for index, _ in duplicates])
+            journal.finish_job(job_id)
+            # 跳过的位置从日志中取回结果
+            if skipped:
+                for index, row in journal.iter_rows(job_id):
+                    if index in skipped:
+                        results[index] = row
+                        if result_callback:
+                            result_callback(index, row)
+
+        return [results[index] for index in range(len(results))]
+
+    def run(self, part_numbers: Iterable[str],
+            progress_callback: Optional[ProgressCallback] = None,
+            journal: Optional[JobJournal] = None, job_id: Optional[str] = None,
+            result_callback: Optional[ResultCallback] = None) -> List[PartResult]:
+        """
+        同步入口，供Streamlit和脚本在没有事件循环时调用
+
+        Args:
+            part_numbers: 元件型号序列
+            progress_callback: 进度回调
+            journal: 任务日志
+            job_id: 任务ID
+            result_callback: 结果回调
+
+        Returns:
+            与输入顺序一致的查询结果列表
+        """
+        return asyncio.run(self.search_many(part_numbers, progress_callback, journal, job_id, result_callback))
@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sized
+
+import config
+from async_engine import AsyncLookupEngine
+from job_journal import JobJournal
+from mouser_api import MouserAPI
+from result_record import PartResult
+from scheduler import PRIORITY_INTERACTIVE
+
+# 后台任务状态
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class BackgroundJob:
+    """
+    一个在后台执行的批量查询任务
+
+    工作线程通过回调写入进度和每一行结果，界面线程随时读取当前状态和已完成的部分结果。
+    元件可以是逐行读取的迭代器，此时 total 在任务结束前为None。
+    """
+
+    def __init__(self, job_id: str, components: Iterable[str]):
+        self.job_id = job_id
+        self.components = components
+        self.total: Optional[int] = len(components) if isinstance(components, Sized) else None
+        self.completed = 0
+        self.current = ""
+        self.status = STATUS_QUEUED
+        self.error = ""
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        # 完成后的全部结果，按输入顺序排列
+        self.results: Optional[List[PartResult]] = None
+        self._rows: Dict[int, PartResult] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        """任务是否已结束（成功或失败）"""
+        return self.status in (STATUS_DONE, STATUS_FAILED)
+
+    def on_progress(self, completed: int, component: str):
+        """引擎的进度回调"""
+        self.completed = completed
+        self.current = component
+
+    def on_result(self, index: int, row: PartResult):
+        """引擎的结果回调"""
+        with self._lock:
+            self._rows[index] = row
+
+    def partial_results(self) -> List[PartResult]:
+        """
+        返回目前已完成的结果
+
+        Returns:
+            按输入顺序排列的已完成结果，任务结束后与 results 相同
+        """
+        if self.results is not None:
+            return self.results
+        with self._lock:
+            return [self._rows[index] for index in sorted(self._rows)]
+
+
+class BackgroundJobRunner:
+    """
+    后台批量查询任务池
+
+    任务在线程池中执行，不受Streamlit脚本重新运行的影响。
+    交互优先级的任务使用单独的线程池，不会排在正在执行的批量任务之后。
+    同一任务ID正在执行时再次提交会返回已有的任务，不会重复查询。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_finished_jobs: Optional[int] = None):
+        self.max_workers = max_workers if max_workers is not None else config.BACKGROUND_JOB_WORKERS
+        self.max_finished_jobs = (max_finished_jobs if max_finished_jobs is not None
+                                  else config.BACKGROUND_JOB_HISTORY)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="lookup-job")
+        self._interactive_executor = ThreadPoolExecutor(max_workers=config.INTERACTIVE_JOB_WORKERS,
+                                                        thread_name_prefix="interactive-job")
+        self._jobs: Dict[str, BackgroundJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: str, mouser_api: MouserAPI, components: Iterable[str],
+               journal: Optional[JobJournal] = None) -> BackgroundJob:
+        """
+        提交一个批量查询任务
+
+        Args:
+            job_id: 任务ID，同时用作任务日志中的ID
+            mouser_api: 执行查询的API实例，其优先级决定任务使用的线程池
+            components: 元件型号列表，或从文件逐行读取的迭代器
+            journal: 任务日志，提供时中断后可以续跑
+
+        Returns:
+            新提交的任务，或同一ID下尚未结束的已有任务
+        """
+        with self._lock:
+            existing = self._jobs.get(job_id)
+            if existing is not None and not existing.finished:
+                return existing
+            job = BackgroundJob(job_id, components)
+            self._jobs[job_id] = job
+            self._prune()
+        executor = self._interactive_executor if mouser_api.priority == PRIORITY_INTERACTIVE else self._executor
+        executor.submit(self._run, job, mouser_api, journal)
+        return job
+
+    def get(self, job_id: str) -> Optional[BackgroundJob]:
+        """按任务ID获取任务，已被清理的任务返回None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: BackgroundJob, mouser_api: MouserAPI, journal: Optional[JobJournal]):
+        job.status = STATUS_RUNNING
+        try:
+            engine = AsyncLookupEngine(mouser_api)
+            job.results = engine.run(job.components, job.on_progress,
+                                     journal, job.job_id if journal is not None else None, job.on_result)
+            job.total = len(job.results)
+            job.status = STATUS_DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = STATUS_FAILED
+            print(f"后台任务 {job.job_id} 失败: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        """只保留最近结束的若干个任务，调用时必须持有锁"""
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.job_id]
+
+    def shutdown(self):
+        """等待正在执行的任务结束并关闭线程池"""
+        self._executor.shutdown(wait=True)
+        self._interactive_executor.shutdown(wait=True)
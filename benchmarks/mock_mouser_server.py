@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟的 Mouser 搜索接口，用于在不消耗API配额的情况下测试性能
+
+实现 POST /api/v1/search/partnumber?apiKey=... 的请求和响应格式:
+- 支持用 | 分隔的多个型号
+- 型号以 MISS 开头时精确搜索找不到，PartialMatch 搜索返回带包装后缀的相似型号
+- 可配置响应延迟和 429 限流的比例
+
+    python benchmarks/mock_mouser_server.py --port 8765 --latency-ms 50 --error-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+SEARCH_PATH = "/api/v1/search/partnumber"
+
+# 固定的价格阶梯
+PRICE_BREAKS = [
+    {"Quantity": 1, "Price": "¥3.52", "Currency": "CNY"},
+    {"Quantity": 10, "Price": "¥2.87", "Currency": "CNY"},
+    {"Quantity": 100, "Price": "¥1.96", "Currency": "CNY"},
+    {"Quantity": 1000, "Price": "¥1.2345", "Currency": "CNY"},
+    {"Quantity": 2500, "Price": "¥1,024.50", "Currency": "CNY"}
+]
+
+
+def make_part(part_number: str) -> Dict:
+    """生成一个产品数据"""
+    return {
+        "Availability": "12,345 In Stock",
+        "DataSheetUrl": f"https://www.mouser.com/datasheet/2/{part_number}.pdf",
+        "Description": f"Mock part {part_number}",
+        "FactoryStock": "0",
+        "ImagePath": f"https://www.mouser.com/images/{part_number}.jpg",
+        "Category": "Mock Category",
+        "LeadTime": "42 Days",
+        "LifecycleStatus": "Not Recommended for New Designs" if part_number.endswith("NRND") else None,
+        "Manufacturer": "Mock Semiconductor",
+        "ManufacturerPartNumber": part_number,
+        "Min": "1",
+        "Mult": "1",
+        "MouserPartNumber": f"595-{part_number}",
+        "ProductAttributes": [{"AttributeName": "Packaging", "AttributeValue": "Reel"}],
+        "PriceBreaks": PRICE_BREAKS,
+        "AlternatePackagings": None,
+        "ProductDetailUrl": f"https://www.mouser.com/ProductDetail/{part_number}",
+        "Reeling": True,
+        "ROHSStatus": "RoHS Compliant",
+        "SuggestedReplacement": "",
+        "MultiSimBlue": 0,
+        "ProductCompliance": [{"ComplianceName": "USHTS", "ComplianceValue": "8542330001"}]
+    }
+
+
+class MockMouserServer(ThreadingHTTPServer):
+    """模拟服务器，保存配置和请求统计"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency_ms: float = 0.0, latency_jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, retry_after: Optional[float] = None):
+        super().__init__(address, MockMouserHandler)
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.throttled_count = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{SEARCH_PATH}"
+
+    def search(self, part_numbers: List[str], search_option: str) -> List[Dict]:
+        """按请求的型号生成响应中的产品列表"""
+        parts = []
+        for part_number in part_numbers:
+            if not part_number.upper().startswith("MISS"):
+                parts.append(make_part(part_number))
+            elif search_option == "PartialMatch":
+                # 相似型号：去掉 MISS 前缀并加上包装后缀
+                parts.append(make_part(part_number[4:].lstrip("-") + "-TR"))
+        # 批量请求时打乱返回顺序，模拟真实接口
+        random.shuffle(parts)
+        return parts
+
+
+class MockMouserHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体一起发送，避免 keep-alive 连接上的延迟确认拖慢每个请求
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server: MockMouserServer = self.server
+        request = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        with server.stats_lock:
+            server.request_count += 1
+
+        if request.path != SEARCH_PATH:
+            self._send_json(404, {"Errors": [{"Message": "Not Found"}]})
+            return
+        if not parse_qs(request.query).get("apiKey"):
+            self._send_json(200, {"Errors": [{"Code": "Required", "Message": "Invalid unique identifier."}],
+                                  "SearchResults": None})
+            return
+
+        if server.latency_ms or server.latency_jitter_ms:
+            delay = server.latency_ms + random.uniform(-1, 1) * server.latency_jitter_ms
+            time.sleep(max(delay, 0) / 1000.0)
+
+        if server.error_rate and random.random() < server.error_rate:
+            with server.stats_lock:
+                server.throttled_count += 1
+            headers = {"Retry-After": str(server.retry_after)} if server.retry_after is not None else None
+            self._send_json(429, {"Errors": [{"Code": "TooManyRequests", "Message": "Rate limit exceeded"}]},
+                            headers)
+            return
+
+        try:
+            search = json.loads(body)["SearchByPartRequest"]
+            part_numbers = [part for part in search["mouserPartNumber"].split("|") if part]
+            search_option = search.get("partSearchOptions") or "None"
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send_json(400, {"Errors": [{"Message": "Bad request"}]})
+            return
+
+        parts = server.search(part_numbers, search_option)
+        self._send_json(200, {"Errors": [], "SearchResults": {"NumberOfResult": len(parts), "Parts": parts}})
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **options) -> MockMouserServer:
+    """
+    在后台线程中启动模拟服务器
+
+    Args:
+        host: 监听地址
+        port: 监听端口，0表示随机端口
+        options: 传给 MockMouserServer 的配置
+
+    Returns:
+        已启动的服务器，通过 server.url 获取接口地址
+    """
+    server = MockMouserServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的 Mouser 搜索接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="平均响应延迟(毫秒)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=10.0, help="响应延迟的随机波动(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 429 的请求比例")
+    parser.add_argument("--retry-after", type=float, help="429 响应中 Retry-After 的秒数")
+    args = parser.parse_args()
+
+    server = MockMouserServer((args.host, args.port), args.latency_ms, args.latency_jitter_ms,
+                              args.error_rate, args.retry_after)
+    print(f"模拟服务器已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
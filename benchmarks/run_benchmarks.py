@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+查询和导出性能基准测试，使用本地模拟服务器，不消耗真实API配额
+
+场景:
+- single: 逐个调用 MouserAPI.search_part
+- batch: Streamlit 和命令行使用的批量查询流程（AsyncLookupEngine）
+- export: 将查询结果流式导出为Excel
+
+每个场景在单独的子进程中运行，以便分别统计峰值内存:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenarios batch --sizes 100,10000 --latency-ms 20 --error-rate 0.02
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from mock_mouser_server import start_mock_server
+
+# 各场景的默认规模
+DEFAULT_SIZES = {
+    "single": [100, 1000],
+    "batch": [100, 10000, 100000],
+    "export": [100, 10000, 100000]
+}
+
+# 模拟使用的API密钥，限额足够大，只测量客户端本身的吞吐量
+BENCH_KEYS = [f"bench-key-{index}" for index in range(3)]
+
+
+def percentile(values: List[float], ratio: float) -> float:
+    """计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值内存(MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_part_numbers(size: int, miss_rate: float) -> List[str]:
+    """生成测试用的型号，按 miss_rate 的比例混入精确搜索找不到的型号"""
+    miss_every = int(1 / miss_rate) if miss_rate > 0 else 0
+    part_numbers = []
+    for index in range(size):
+        if miss_every and index % miss_every == 0:
+            part_numbers.append(f"MISS-BENCH{index:06d}")
+        else:
+            part_numbers.append(f"BENCH{index:06d}")
+    return part_numbers
+
+
+def make_api(server_url: str, concurrency: int):
+    """创建指向模拟服务器的 MouserAPI，并记录每个HTTP请求的耗时"""
+    from mouser_api import MouserAPI
+
+    config.MOUSER_KEY_LIMITS = {key: (10 ** 9, 10 ** 9) for key in BENCH_KEYS}
+    # 模拟请求不计入真实密钥的配额记录
+    config.KEY_USAGE_PATH = ":memory:"
+    config.MAX_CONCURRENCY = concurrency
+    api = MouserAPI(BENCH_KEYS, search_url=server_url)
+
+    latencies = []
+    post = api.session.post
+
+    def timed_post(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return post(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    api.session.post = timed_post
+    return api, latencies
+
+
+def run_scenario(args) -> Dict:
+    """在当前进程中运行一个场景，返回统计结果"""
+    size = args.size
+    stats = {"scenario": args.scenario, "size": size}
+
+    if args.scenario == "export":
+        from excel_handler import ExcelHandler
+        from result_record import PartResult
+
+        tiers = [(1, 3.52), (10, 2.87), (100, 1.96), (1000, 1.2345)]
+        rows = (
+            PartResult(f"BENCH{index:06d}", f"BENCH{index:06d}", f"BENCH{index:06d}", "Mock Semiconductor",
+                       1.2345, 1000, "12,345 In Stock", False, "", "", tiers)
+            for index in range(size)
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            ExcelHandler.export_results_streaming(rows, os.path.join(directory, "bench.xlsx"))
+            elapsed = time.perf_counter() - start
+        stats.update({"seconds": elapsed, "rows_per_second": size / elapsed})
+        stats["peak_rss_mb"] = peak_rss_mb()
+        return stats
+
+    server = start_mock_server(latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                               error_rate=args.error_rate, retry_after=args.retry_after)
+    api, latencies = make_api(server.url, args.concurrency)
+    part_numbers = make_part_numbers(size, args.miss_rate)
+
+    start = time.perf_counter()
+    if args.scenario == "single":
+        for part_number in part_numbers:
+            api.search_part(part_number)
+    else:
+        from async_engine import AsyncLookupEngine
+        AsyncLookupEngine(api, args.concurrency, args.batch_size).run(part_numbers)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    stats.update({
+        "seconds": elapsed,
+        "parts_per_second": size / elapsed,
+        "requests": server.request_count,
+        "requests_per_second": server.request_count / elapsed,
+        "throttled": server.throttled_count,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_rss_mb": peak_rss_mb()
+    })
+    return stats
+
+
+def format_stats(stats: Dict) -> str:
+    """格式化一行结果"""
+    line = f"{stats['scenario']:<7} {stats['size']:>7} 个  {stats['seconds']:>8.2f} 秒"
+    if stats["scenario"] == "export":
+        line += f"  {stats['rows_per_second']:>9.0f} 行/秒"
+    else:
+        line += (f"  {stats['parts_per_second']:>8.1f} 个/秒  {stats['requests_per_second']:>8.1f} 请求/秒"
+                 f"  429: {stats['throttled']:>4}  p50 {stats['p50_ms']:>7.1f} ms  p99 {stats['p99_ms']:>7.1f} ms")
+    return line + f"  峰值内存 {stats['peak_rss_mb']:.0f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询和导出性能基准测试")
+    parser.add_argument("--scenarios", default="single,batch,export", help="要运行的场景，用逗号分隔")
+    parser.add_argument("--sizes", help="元件数量，用逗号分隔（默认按场景使用不同规模）")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="模拟服务器的平均响应延迟(毫秒)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=2.0, help="响应延迟的随机波动(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 429 的请求比例")
+    parser.add_argument("--retry-after", type=float, help="429 响应中 Retry-After 的秒数")
+    parser.add_argument("--miss-rate", type=float, default=0.05, help="精确搜索找不到、需要相似型号搜索的比例")
+    parser.add_argument("--concurrency", type=int, default=config.MAX_CONCURRENCY, help="并发查询数量")
+    parser.add_argument("--batch-size", type=int, default=config.MOUSER_BATCH_SIZE, help="单个请求合并的型号数量")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    # 内部参数：在子进程中运行单个场景
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args)))
+        return 0
+
+    passthrough = [
+        "--latency-ms", str(args.latency_ms), "--latency-jitter-ms", str(args.latency_jitter_ms),
+        "--error-rate", str(args.error_rate), "--miss-rate", str(args.miss_rate),
+        "--concurrency", str(args.concurrency), "--batch-size", str(args.batch_size)
+    ]
+    if args.retry_after is not None:
+        passthrough += ["--retry-after", str(args.retry_after)]
+
+    results = []
+    for scenario in [name.strip() for name in args.scenarios.split(",") if name.strip()]:
+        if scenario not in DEFAULT_SIZES:
+            parser.error(f"未知场景: {scenario}")
+        sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else DEFAULT_SIZES[scenario]
+        for size in sizes:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--scenario", scenario, "--size", str(size)] + passthrough,
+                check=True, capture_output=True, text=True
+            ).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            results.append(stats)
+            if not args.json:
+                print(format_stats(stats), flush=True)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
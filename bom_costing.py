@@ -0,0 +1,124 @@
+import numpy as np
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from pricing import PriceTable
+from result_record import PartResult
+
+
+def price_table_from_results(results: Iterable[PartResult]) -> PriceTable:
+    """
+    从查询结果中保存的价格阶梯构建价格表，每行结果对应一行BOM
+
+    Args:
+        results: 查询结果序列
+
+    Returns:
+        价格表
+    """
+    results = list(results)
+    return PriceTable.from_tiers((result.price_breaks for result in results),
+                                 (result.currency for result in results))
+
+
+def bom_currency(price_table: PriceTable) -> str:
+    """
+    返回BOM中有价格的行使用的货币，用于标注总价
+
+    Args:
+        price_table: 每行BOM的价格表
+
+    Returns:
+        货币代码，所有行的货币都未知时为空；不同行的货币不同、不能直接相加时抛出 ValueError
+    """
+    codes = {price_table.currency(part) for part in range(len(price_table))} - {""}
+    if len(codes) > 1:
+        raise ValueError(f"BOM中包含多种货币（{', '.join(sorted(codes))}），不能直接相加")
+    return codes.pop() if codes else ""
+
+
+def unit_prices(price_table: PriceTable, order_quantities: np.ndarray) -> np.ndarray:
+    """
+    查找每行BOM在各购买数量下适用的阶梯单价
+
+    所有产品的阶梯按 (产品序号, 数量) 排列成一个有序键数组，
+    用一次 searchsorted 同时完成全部行、全部数量的查找。
+
+    Args:
+        price_table: 价格表
+        order_quantities: 形状为 (行数, 场景数) 的购买数量矩阵
+
+    Returns:
+        同形状的单价矩阵，购买数量低于最小阶梯时按最小阶梯计价，没有价格信息的行为0
+    """
+    line_count = len(price_table)
+    offsets = np.frombuffer(price_table.offsets, dtype=np.dtype(price_table.offsets.typecode)).astype(np.int64)
+    quantities = np.frombuffer(price_table.quantities, dtype=np.dtype(price_table.quantities.typecode)).astype(np.int64)
+    prices = np.frombuffer(price_table.prices, dtype=np.float64)
+    part_index = np.frombuffer(price_table.part_index, dtype=np.dtype(price_table.part_index.typecode)).astype(np.int64)
+
+    order_quantities = np.asarray(order_quantities, dtype=np.int64).reshape(line_count, -1)
+    if len(prices) == 0:
+        return np.zeros(order_quantities.shape, dtype=np.float64)
+
+    # 键 = 产品序号 * 步长 + 数量，步长大于所有数量，保证不同产品的键不重叠
+    stride = int(max(quantities.max(), order_quantities.max(initial=0))) + 1
+    tier_keys = part_index * stride + quantities
+    lines = np.arange(line_count, dtype=np.int64)[:, None]
+    positions = np.searchsorted(tier_keys, lines * stride + order_quantities, side="right") - 1
+
+    starts = offsets[:-1][:, None]
+    ends = offsets[1:][:, None]
+    positions = np.clip(positions, starts, np.maximum(ends - 1, starts))
+    has_price = np.broadcast_to(ends > starts, positions.shape)
+
+    result = np.zeros(order_quantities.shape, dtype=np.float64)
+    result[has_price] = prices[positions[has_price]]
+    return result
+
+
+def cost_matrix(price_table: PriceTable, build_quantities: Sequence[int],
+                line_quantities: Optional[Sequence[float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算BOM在多个生产数量下的成本，不发送任何网络请求
+
+    Args:
+        price_table: 每行BOM的价格表
+        build_quantities: 生产数量列表，如 [100, 1000, 10000]
+        line_quantities: 每行BOM的单机用量，默认每行为1
+
+    Returns:
+        (单价矩阵, 金额矩阵) 元组，形状均为 (行数, 生产数量个数)
+    """
+    line_count = len(price_table)
+    builds = np.asarray(build_quantities, dtype=np.float64)
+    if line_quantities is None:
+        per_unit = np.ones(line_count, dtype=np.float64)
+    else:
+        per_unit = np.asarray(line_quantities, dtype=np.float64)
+        if len(per_unit) != line_count:
+            raise ValueError("单机用量数量与BOM行数不一致")
+
+    # 购买数量 = 单机用量 * 生产数量，不足1个按1个计
+    order_quantities = np.maximum(np.ceil(per_unit[:, None] * builds[None, :]), 1).astype(np.int64)
+    prices = unit_prices(price_table, order_quantities)
+    return prices, prices * order_quantities
+
+
+def parse_build_quantities(text: str) -> List[int]:
+    """
+    解析以逗号或空格分隔的生产数量，如 "100, 1k, 10000"
+
+    Args:
+        text: 生产数量字符串，支持 k/w 后缀（千/万）
+
+    Returns:
+        生产数量列表
+    """
+    multipliers = {"k": 1000, "K": 1000, "w": 10000, "W": 10000}
+    quantities = []
+    for token in text.replace("，", ",").replace(",", " ").split():
+        multiplier = multipliers.get(token[-1], 1)
+        if multiplier != 1:
+            token = token[:-1]
+        quantities.append(int(float(token) * multiplier))
+    return [quantity for quantity in quantities if quantity > 0]
@@ -6,7 +6,88 @@ MOUSER_API_KEYS = [
 ]
 
 # API 请求限制配置
-REQUEST_DELAY = 1  # 请求间隔(秒)
+# 每个密钥的请求上限（Mouser API 文档: 每分钟30次，每天1000次）
+MOUSER_REQUESTS_PER_MINUTE = 30
+MOUSER_REQUESTS_PER_DAY = 1000
+# 单个密钥的上限覆盖，格式: {"密钥": (每分钟次数, 每天次数)}
+MOUSER_KEY_LIMITS = {}
+
+# 批量查询配置
+MAX_CONCURRENCY = 8  # 同时进行的查询数量上限
+MOUSER_BATCH_SIZE = 10  # 单个请求最多包含的型号数量（Mouser 接口上限）
+
+# 每个API密钥的自适应并发控制（加性增、乘性减）
+ADAPTIVE_INITIAL_CONCURRENCY = 2  # 初始同时在途请求数
+ADAPTIVE_MIN_CONCURRENCY = 1  # 最小同时在途请求数
+ADAPTIVE_MAX_CONCURRENCY = 16  # 最大同时在途请求数
+ADAPTIVE_DECREASE_FACTOR = 0.5  # 遇到限流或延迟突增时上限乘以该系数
+ADAPTIVE_LATENCY_SPIKE_FACTOR = 3.0  # 延迟超过基线的该倍数时视为拥塞
+
+# API密钥配额统计和熔断
+KEY_USAGE_PATH = "mouser_keys.sqlite3"  # 按滚动24小时记录各密钥请求次数的数据库文件（只保存密钥摘要）
+KEY_BREAKER_FAILURES = 5  # 连续失败多少次后暂停使用该密钥
+KEY_BREAKER_OPEN_SECONDS = 30  # 首次暂停的时长(秒)，探测失败后加倍
+KEY_BREAKER_MAX_OPEN_SECONDS = 1800  # 暂停时长上限(秒)
+KEY_QUOTA_COOLDOWN = 3600  # Mouser提示配额用尽、本地又没有用量记录时暂停的时长(秒)
+KEY_AUTH_COOLDOWN = 6 * 3600  # 密钥无效或被停用时暂停的时长(秒)
+KEY_MAX_WAIT = 120  # 所有密钥都要等待超过该秒数时直接报错，而不是一直等待
+
+# 请求超时与重试配置
+REQUEST_TIMEOUT = (5, 30)  # (连接超时, 读取超时)(秒)
+RETRY_MAX_ATTEMPTS = 4  # 单个请求的最大尝试次数
+RETRY_BACKOFF_BASE = 1.0  # 指数退避的基础等待时间(秒)
+RETRY_BACKOFF_MAX = 30.0  # 单次退避的最长等待时间(秒)
+
+# 本地响应缓存配置
+CACHE_DB_PATH = "mouser_cache.sqlite3"  # 缓存数据库文件
+CACHE_PRICE_TTL = 6 * 3600  # 含价格/库存数据的条目有效期(秒)
+CACHE_STATIC_TTL = 30 * 86400  # 不含价格/库存数据的条目有效期(秒)
+CACHE_MAX_ENTRIES = 200000  # 缓存条目上限，超出时淘汰最久未访问的条目
+CACHE_NOT_FOUND_TTL = 24 * 3600  # 确认未找到的型号的有效期(秒)，0表示不缓存
+
+# 对历史上经常找不到的型号，精确搜索和相似型号搜索同时发起
+SPECULATIVE_LOOKUP = True
+SPECULATIVE_MISS_THRESHOLD = 0.5  # 估计的未找到概率达到该值时提前搜索相似型号
+SPECULATIVE_WORKERS = 4  # 提前搜索相似型号的线程数
+MISS_HISTORY_SIZE = 100000  # 记录历史结果的型号数量上限
+
+# 本地相似型号索引（保存在缓存数据库中），置信度足够时不发送模糊搜索请求
+FUZZY_MIN_CONFIDENCE = 0.8  # 共同前缀长度 / 较长型号的长度 达到该值才使用本地结果
+FUZZY_MIN_PREFIX = 5  # 共同前缀至少的字符数
+FUZZY_MAX_CANDIDATES = 50  # 每次查询最多比较的候选型号数量
+
+# 后台刷新常用型号（保存在缓存数据库中），在低峰时段提前获取价格和库存
+HOT_SET_MAX_SIZE = 5000  # 记录的常用型号数量上限，超出时淘汰查询最少的型号
+REFRESH_MIN_AGE = CACHE_PRICE_TTL / 2  # 距上次刷新不足该秒数的型号不刷新
+REFRESH_MAX_PARTS = 2000  # 每轮最多刷新的型号数量
+REFRESH_OFF_PEAK_HOURS = (1, 7)  # 低峰时段 [开始小时, 结束小时)，本地时间
+REFRESH_INTERVAL = 1800  # 持续运行时两轮刷新之间的间隔(秒)
+# 为True时网页进程内用 MOUSER_API_KEYS 运行后台刷新，与使用相同密钥的查询共享调度器，只使用它们剩下的配额
+REFRESH_IN_APP = False
+
+# 批量任务日志，用于中断后续跑
+JOB_JOURNAL_PATH = "mouser_jobs.sqlite3"
+
+# 多进程分片队列，分片的查询结果也保存在同一文件中，多台主机共享该文件即可协同处理
+WORK_QUEUE_PATH = "mouser_queue.sqlite3"
+# 队列文件的日志模式。WAL模式依赖共享内存，不能用于网络文件系统，因此使用回滚日志(DELETE)
+WORK_QUEUE_JOURNAL_MODE = "DELETE"
+WORK_QUEUE_SHARD_SIZE = 500  # 每个分片的元件数量
+WORK_QUEUE_LEASE_SECONDS = 600  # 分片租约时长(秒)，超时未完成的分片重新放回队列
+WORK_QUEUE_MAX_ATTEMPTS = 5  # 分片最多被领取的次数，超过后标记为失败
+WORK_QUEUE_POLL_INTERVAL = 5.0  # 等待其他进程时检查队列的间隔(秒)
+
+# 网页界面后台查询任务的线程数、保留的已结束任务数和进度刷新间隔(秒)
+BACKGROUND_JOB_WORKERS = 2
+BACKGROUND_JOB_HISTORY = 20
+JOB_POLL_INTERVAL = 1.0
+
+# 元件数不超过该值的网页查询作为交互查询，优先分配令牌，并在单独的线程中执行，不排在批量任务之后
+INTERACTIVE_MAX_COMPONENTS = 20
+INTERACTIVE_JOB_WORKERS = 2
+
+# Prometheus /metrics 接口端口，None 表示不启动
+METRICS_PORT = None
 
 # 默认输出文件名
 OUTPUT_EXCEL_TEMPLATE = "贸泽电子元件查询模板.xlsx"
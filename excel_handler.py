@@ -1,12 +1,30 @@
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.utils import get_column_letter
+from openpyxl.cell import WriteOnlyCell
 import config
-from typing import List, Dict, Optional, Union
+import csv
+from result_record import DISPLAY_FIELDS, PartResult
+from itertools import chain, islice
+from typing import BinaryIO, Iterable, Iterator, List, Optional, TextIO, Union
 from io import BytesIO
 
+# 读取元件列表时支持的输入：文件路径、文件内容字节或文件对象
+ComponentSource = Union[str, bytes, BinaryIO, TextIO]
+
+# 元件型号列可能使用的列名
+COMPONENT_COLUMNS = ["元件型号", "Part Number", "型号", "元件编号"]
+
+# 结果文件的列标题，与 result_record.DISPLAY_FIELDS 的顺序一致，部分列标题带单位
+RESULT_COLUMN_UNITS = {"价格": "价格(CNY)", "最大批次": "最大批次(pcs)"}
+RESULT_COLUMNS = [RESULT_COLUMN_UNITS.get(label, label) for _, label in DISPLAY_FIELDS]
+PRICE_COLUMN_INDEX = 4  # 价格列（价格(CNY)）
+QUANTITY_COLUMN_INDEX = 5  # 批次数量列（最大批次(pcs)）
+
+# 流式导出时用于估算列宽的行数
+WIDTH_SAMPLE_ROWS = 1000
+
 class ExcelHandler:
     @staticmethod
     def create_input_template(file_path: Optional[Union[str, BytesIO]] = None):
@@ -16,6 +34,9 @@ class ExcelHandler:
         Args:
             file_path: 模板文件保存路径，可以是字符串路径或BytesIO对象
         """
+        # pandas 只在生成模板时使用，延迟导入以加快命令行批处理的启动
+        import pandas as pd
+        
         if file_path is None:
             file_path = config.OUTPUT_EXCEL_TEMPLATE
             
@@ -84,7 +105,7 @@ class ExcelHandler:
                 print(f"输入模板已创建: {file_path}")
     
     @staticmethod
-    def create_result_template(results: List[Dict], file_path: Optional[Union[str, BytesIO]] = None):
+    def create_result_template(results: List[PartResult], file_path: Optional[Union[str, BytesIO]] = None):
         """
         创建结果Excel文件
         
@@ -92,156 +113,220 @@ class ExcelHandler:
             results: 查询结果列表
             file_path: 结果文件保存路径，可以是字符串路径或BytesIO对象
         """
+        ExcelHandler.export_results_streaming(results, file_path)
+    
+    @staticmethod
+    def export_results_streaming(results: Iterable[PartResult], file_path: Optional[Union[str, BytesIO]] = None):
+        """
+        以只写模式流式导出结果Excel文件，逐行写入，内存占用与行数无关
+        
+        列宽根据表头和前 WIDTH_SAMPLE_ROWS 行估算（只写模式下列宽必须在写入数据行之前确定）
+        
+        Args:
+            results: 查询结果的可迭代对象，可以是列表或生成器
+            file_path: 结果文件保存路径，可以是字符串路径或BytesIO对象
+        """
         if file_path is None:
             file_path = config.OUTPUT_EXCEL_RESULT
-            
-        # 定义正确的列顺序（与GUI中显示的顺序完全一致）
-        column_order = [
-            "元件型号", "搜索型号", "产品名称", "品牌", 
-            "价格", "最大批次", "库存", "是否停产", 
-            "替代型号", "备注"
-        ]
-        
-        # 定义中文列名映射
-        chinese_columns = {
-            "元件型号": "元件型号",
-            "搜索型号": "搜索型号", 
-            "产品名称": "产品名称",
-            "品牌": "品牌",
-            "价格": "价格(CNY)",
-            "最大批次": "最大批次(pcs)",
-            "库存": "库存",
-            "是否停产": "是否停产",
-            "替代型号": "替代型号",
-            "备注": "备注"
-        }
         
-        # 创建DataFrame
-        df = pd.DataFrame(results)
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("查询结果")
         
-        # 确保列顺序正确（关键修复点）
-        # 先选择需要的列，再重新排序
-        df_selected = df[column_order]
+        # 预先创建样式对象，所有单元格共享
+        header_font = Font(bold=True, color="FFFFFF", size=12)
+        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+        alignment = Alignment(horizontal="center", vertical="center")
+        thin_border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
         
-        # 重命名列
-        df_final = df_selected.rename(columns=chinese_columns)  # type: ignore
+        def make_cell(value, number_format=None):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.alignment = alignment
+            cell.border = thin_border
+            if number_format:
+                cell.number_format = number_format
+            return cell
         
-        # 创建工作簿
-        wb = Workbook()
-        ws = wb.active
-        if ws is not None:
-            ws.title = "查询结果"
+        # 每种格式只注册一次命名样式，数据单元格按名称引用，避免逐个设置字体、边框和对齐
+        style_names = {}
         
-            # 添加数据
-            for r in dataframe_to_rows(df_final, index=False, header=True):
-                ws.append(r)
-            
-            # 设置样式
-            header_font = Font(bold=True, color="FFFFFF", size=12)
-            header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-            alignment = Alignment(horizontal="center", vertical="center")
+        def make_data_cell(value, number_format=None):
+            style_name = style_names.get(number_format)
+            if style_name is None:
+                style_name = style_names[number_format] = f"结果数据{len(style_names)}"
+                wb.add_named_style(NamedStyle(name=style_name, alignment=alignment, border=thin_border,
+                                              number_format=number_format or "General"))
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style_name
+            return cell
         
-            # 设置边框
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
+        def make_row(result: PartResult) -> list:
+            cells = []
+            for column_index, value in enumerate(result.display_values()):
+                number_format = None
+                is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                # 对价格列进行特殊格式化
+                if column_index == PRICE_COLUMN_INDEX and is_number:
+                    number_format = '"¥"#,##0.00000' if value > 0 else '"¥"0'
+                # 对批次数量列进行特殊格式化
+                elif column_index == QUANTITY_COLUMN_INDEX and is_number:
+                    number_format = '#,##0'
+                cells.append(make_data_cell(value, number_format))
+            return cells
         
-            # 格式化标题行
-            for cell in ws[1]:
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = alignment
-                cell.border = thin_border
-            
-            # 格式化数据行
-            for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-                for cell in row:
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-                    cell.border = thin_border
-                
-                    # 对价格列进行特殊格式化（第5列，openpyxl列索引从1开始）
-                    if cell.column == 5:  # 价格列（价格(CNY)）
-                        if isinstance(cell.value, (int, float)) and cell.value > 0:
-                            cell.number_format = '"¥"#,##0.00000'
-                        elif isinstance(cell.value, (int, float)):
-                            cell.number_format = '"¥"0'
-                
-                    # 对批次数量列进行特殊格式化（第6列，openpyxl列索引从1开始）
-                    if cell.column == 6:  # 批次数量列（最大批次(pcs)）
-                        if isinstance(cell.value, (int, float)):
-                            cell.number_format = '#,##0'
-            
-            # 自动调整列宽
-            for i, column in enumerate(ws.columns, 1):
-                max_length = 0
-                column_letter = get_column_letter(i)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # 保存文件
-            if isinstance(file_path, BytesIO):
-                wb.save(file_path)
-            else:
-                wb.save(file_path)
-                print(f"结果文件已创建: {file_path}")
+        # 读取前若干行估算列宽
+        headers = RESULT_COLUMNS
+        widths = [len(title) for title in headers]
+        rows = iter(results)
+        sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+        for result in sample:
+            for column_index, value in enumerate(result.display_values()):
+                widths[column_index] = max(widths[column_index], len(str(value)))
+        for column_index, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(column_index)].width = width + 2
+        
+        # 写入标题行
+        header_cells = []
+        for title in headers:
+            cell = make_cell(title)
+            cell.font = header_font
+            cell.fill = header_fill
+            header_cells.append(cell)
+        ws.append(header_cells)
+        
+        # 逐行写入数据
+        for result in chain(sample, rows):
+            ws.append(make_row(result))
+        
+        # 保存文件
+        wb.save(file_path)
+        if not isinstance(file_path, BytesIO):
+            print(f"结果文件已创建: {file_path}")
+    
+    @staticmethod
+    def export_results_csv(results: Iterable[PartResult], file_path: Union[str, TextIO]):
+        """
+        流式导出结果CSV文件（UTF-8 BOM编码，便于Excel直接打开）
+        
+        Args:
+            results: 查询结果的可迭代对象
+            file_path: 结果文件保存路径或文本文件对象
+        """
+        if isinstance(file_path, str):
+            with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+                ExcelHandler.export_results_csv(results, f)
+            print(f"结果文件已创建: {file_path}")
+            return
+        
+        writer = csv.writer(file_path)
+        writer.writerow(RESULT_COLUMNS)
+        for result in results:
+            writer.writerow(result.display_values())
     
     @staticmethod
-    def read_components_from_excel(file_path: str) -> List[str]:
+    def read_components_from_excel(source: ComponentSource) -> List[str]:
         """
         从Excel文件读取电子元器件型号
         
         Args:
-            file_path: Excel文件路径
+            source: Excel文件路径、文件内容字节或文件对象
             
         Returns:
             电子元器件型号列表
         """
         try:
-            df = pd.read_excel(file_path, sheet_name=0)  # 读取第一个工作表
-            # 尝试不同的列名
-            possible_columns = ["元件型号", "Part Number", "型号", "元件编号"]
-            part_numbers = []
-            
-            for col in possible_columns:
-                if col in df.columns:
-                    part_numbers = df[col].dropna().tolist()
-                    break
-            
-            if not part_numbers:
-                # 如果没有找到标准列名，使用第一列
-                first_column = df.columns[0]
-                part_numbers = df[first_column].dropna().tolist()
-                
-            return [str(part_num).strip() for part_num in part_numbers if str(part_num).strip()]
+            return list(ExcelHandler.iter_components_from_excel(source))
         except Exception as e:
             print(f"读取Excel文件时发生错误: {str(e)}")
             return []
     
     @staticmethod
-    def read_components_from_txt(file_path: str) -> List[str]:
+    def iter_components_from_excel(source: ComponentSource) -> Iterator[str]:
+        """
+        以只读模式逐行读取Excel文件中的电子元器件型号，不需要把整个表格加载到内存
+        
+        Args:
+            source: Excel文件路径、文件内容字节或文件对象（如Streamlit上传的文件）
+            
+        Yields:
+            电子元器件型号
+        """
+        if isinstance(source, (bytes, bytearray)):
+            source = BytesIO(source)
+        
+        wb = load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)  # 读取第一个工作表
+            header = next(rows, None)
+            if header is None:
+                return
+            
+            # 尝试不同的列名，如果没有找到标准列名，使用第一列
+            header_names = [str(name).strip() if name is not None else "" for name in header]
+            column_index = 0
+            for col in COMPONENT_COLUMNS:
+                if col in header_names:
+                    column_index = header_names.index(col)
+                    break
+            
+            for row in rows:
+                if column_index >= len(row) or row[column_index] is None:
+                    continue
+                part_num = str(row[column_index]).strip()
+                if part_num:
+                    yield part_num
+        finally:
+            wb.close()
+    
+    @staticmethod
+    def read_components_from_txt(source: ComponentSource) -> List[str]:
         """
         从txt文件读取电子元器件型号
         
         Args:
-            file_path: txt文件路径
+            source: txt文件路径、文件内容字节或文件对象
             
         Returns:
             电子元器件型号列表
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            # 去除空白行和首尾空格
-            return [line.strip() for line in lines if line.strip()]
+            return list(ExcelHandler.iter_components_from_txt(source))
         except Exception as e:
             print(f"读取txt文件时发生错误: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+    
+    @staticmethod
+    def iter_components_from_txt(source: ComponentSource) -> Iterator[str]:
+        """
+        逐行读取txt文件中的电子元器件型号
+        
+        Args:
+            source: txt文件路径、文件内容字节或文件对象（文本或二进制模式均可）
+            
+        Yields:
+            电子元器件型号（已去除空白行和首尾空格）
+        """
+        if isinstance(source, (bytes, bytearray)):
+            source = BytesIO(source)
+        
+        if isinstance(source, str):
+            with open(source, 'r', encoding='utf-8-sig') as f:
+                for line in f:
+                    if line.strip():
+                        yield line.strip()
+            return
+        
+        first_line = True
+        for line in source:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if first_line:
+                # 去除UTF-8 BOM
+                line = line.lstrip('\ufeff')
+                first_line = False
+            if line.strip():
+                yield line.strip()
@@ -0,0 +1,182 @@
+import bisect
+import json
+import sqlite3
+import threading
+import time
+import config
+from part_number import canonicalize
+from typing import Dict, List, Optional, Tuple
+
+# 回填时每次从响应缓存读取的行数
+BACKFILL_PAGE_SIZE = 1000
+
+
+def normalize_key(part_number: str) -> str:
+    """索引使用的型号形式，与查询和缓存使用的规范形式一致"""
+    return canonicalize(part_number)
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """两个字符串共同前缀的长度"""
+    length = min(len(a), len(b))
+    for index in range(length):
+        if a[index] != b[index]:
+            return index
+    return length
+
+
+class PartIndex:
+    """
+    已获取过的型号的本地索引，用于在本地解决相似型号搜索
+
+    以 ManufacturerPartNumber 和 MouserPartNumber 为键，在内存中保存一个有序数组作为前缀索引，
+    产品数据保存在SQLite中。查询时与查询型号共享最长前缀的键一定与其在有序数组中的插入位置相邻，
+    因此一次二分查找即可找到候选，只需扫描共享该前缀的少量键。
+    置信度 = 共同前缀长度 / 两者中较长的长度，如 LM358DR 与 LM358DT 为 6/7。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, min_confidence: Optional[float] = None,
+                 min_prefix: Optional[int] = None, max_candidates: Optional[int] = None):
+        self.db_path = db_path if db_path is not None else config.CACHE_DB_PATH
+        self.min_confidence = min_confidence if min_confidence is not None else config.FUZZY_MIN_CONFIDENCE
+        self.min_prefix = min_prefix if min_prefix is not None else config.FUZZY_MIN_PREFIX
+        self.max_candidates = max_candidates if max_candidates is not None else config.FUZZY_MAX_CANDIDATES
+
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS part_index (
+                    index_key TEXT PRIMARY KEY,
+                    part_json TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+        if not self._load():
+            self._backfill()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _load(self) -> int:
+        """从数据库加载全部键"""
+        with self._lock:
+            rows = self._conn.execute("SELECT index_key FROM part_index ORDER BY index_key").fetchall()
+            self._keys = [row[0] for row in rows]
+            return len(self._keys)
+
+    def _backfill(self):
+        """索引为空时，从同一数据库中的响应缓存导入已获取过的产品"""
+        with self._lock:
+            has_cache = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'part_cache'"
+            ).fetchone()
+        if not has_cache:
+            return
+
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, part_json, accessed_at FROM part_cache WHERE rowid > ? AND part_json != 'null' "
+                    "ORDER BY rowid LIMIT ?",
+                    (last_rowid, BACKFILL_PAGE_SIZE),
+                ).fetchall()
+            if not rows:
+                return
+            for _, part_json, accessed_at in rows:
+                self.add(json.loads(part_json), accessed_at)
+            last_rowid = rows[-1][0]
+
+    def add(self, part_data: Dict, fetched_at: Optional[float] = None):
+        """
+        将获取到的产品加入索引
+
+        Args:
+            part_data: Mouser返回的产品数据
+            fetched_at: 获取时间，默认为当前时间
+        """
+        keys = {
+            normalize_key(str(part_data.get(field) or ""))
+            for field in ("ManufacturerPartNumber", "MouserPartNumber")
+        }
+        keys.discard("")
+        if not keys:
+            return
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        part_json = json.dumps(part_data, ensure_ascii=False)
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO part_index VALUES (?, ?, ?)",
+                    [(key, part_json, fetched_at) for key in keys],
+                )
+            for key in keys:
+                position = bisect.bisect_left(self._keys, key)
+                if position == len(self._keys) or self._keys[position] != key:
+                    self._keys.insert(position, key)
+
+    def match(self, part_number: str) -> Optional[Tuple[str, float]]:
+        """
+        查找与型号最相似的已知型号
+
+        Args:
+            part_number: 查询的型号
+
+        Returns:
+            (索引键, 置信度) 元组，置信度低于 min_confidence 时返回None
+        """
+        query = normalize_key(part_number)
+        if len(query) < self.min_prefix:
+            return None
+
+        with self._lock:
+            keys = self._keys
+            position = bisect.bisect_left(keys, query)
+            prefix_length = 0
+            for neighbor in (position - 1, position):
+                if 0 <= neighbor < len(keys):
+                    prefix_length = max(prefix_length, common_prefix_length(query, keys[neighbor]))
+            if prefix_length < self.min_prefix:
+                return None
+
+            # 扫描共享该前缀的键，选择长度最接近的一个
+            prefix = query[:prefix_length]
+            best_key = None
+            best_score = 0.0
+            index = bisect.bisect_left(keys, prefix)
+            end = min(len(keys), index + self.max_candidates)
+            while index < end and keys[index].startswith(prefix):
+                candidate = keys[index]
+                score = prefix_length / max(len(query), len(candidate))
+                if score > best_score:
+                    best_key, best_score = candidate, score
+                index += 1
+
+        if best_key is None or best_score < self.min_confidence:
+            return None
+        return best_key, best_score
+
+    def get(self, index_key: str) -> Optional[Tuple[Dict, float]]:
+        """
+        读取索引键对应的产品数据
+
+        Returns:
+            (产品数据, 获取时间) 元组，不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT part_json, fetched_at FROM part_index WHERE index_key = ?", (index_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import config
+from typing import Dict, Iterable, List, Optional
+
+from part_number import canonicalize
+
+
+def volatile_fingerprint(part_data: Optional[Dict]) -> str:
+    """价格阶梯和库存的摘要，用于判断两次获取之间是否发生变化"""
+    if part_data is None:
+        return ""
+    volatile = [part_data.get("PriceBreaks"), part_data.get("Availability")]
+    return hashlib.sha1(json.dumps(volatile, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class HotSet:
+    """
+    经常查询的型号集合（SQLite）
+
+    记录每个型号的查询次数、上次刷新时间，以及刷新时价格或库存发生变化的次数，
+    供后台刷新按 陈旧程度 × 变化频率 × 查询热度 排序。超过 max_size 时淘汰最冷的型号。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_size: Optional[int] = None):
+        self.db_path = db_path if db_path is not None else config.CACHE_DB_PATH
+        self.max_size = max_size if max_size is not None else config.HOT_SET_MAX_SIZE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS hot_parts (
+                    part_number TEXT PRIMARY KEY,
+                    query_count INTEGER NOT NULL DEFAULT 0,
+                    last_queried_at REAL NOT NULL DEFAULT 0,
+                    refreshed_at REAL NOT NULL DEFAULT 0,
+                    refresh_count INTEGER NOT NULL DEFAULT 0,
+                    change_count INTEGER NOT NULL DEFAULT 0,
+                    fingerprint TEXT NOT NULL DEFAULT ''
+                )
+                """
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hot_parts").fetchone()[0]
+
+    def record(self, part_numbers: Iterable[str]):
+        """
+        记录一次查询，也用于从历史输入文件导入型号
+
+        Args:
+            part_numbers: 查询的型号，内部转换为规范形式
+        """
+        counts: Dict[str, int] = {}
+        for part_number in part_numbers:
+            key = canonicalize(part_number)
+            if key:
+                counts[key] = counts.get(key, 0) + 1
+        if not counts:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO hot_parts (part_number, query_count, last_queried_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(part_number) DO UPDATE SET query_count = query_count + excluded.query_count, "
+                "last_queried_at = excluded.last_queried_at",
+                [(key, count, now) for key, count in counts.items()],
+            )
+            self._prune()
+
+    def _prune(self):
+        """淘汰查询次数最少、最久未查询的型号，调用时必须持有锁"""
+        count = self._conn.execute("SELECT COUNT(*) FROM hot_parts").fetchone()[0]
+        overflow = count - self.max_size
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM hot_parts WHERE rowid IN "
+                "(SELECT rowid FROM hot_parts ORDER BY query_count, last_queried_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def due(self, limit: int, min_age: Optional[float] = None) -> List[str]:
+        """
+        选出需要刷新的型号
+
+        得分 = 距上次刷新的时间 / 价格缓存有效期 × 价格或库存变化的频率 × (查询次数 + 1)，
+        变化频率按 (变化次数 + 1) / (刷新次数 + 2) 估计，从未刷新过的型号得分最高。
+
+        Args:
+            limit: 最多返回的型号数量
+            min_age: 距上次刷新不足该秒数的型号不返回，默认为 REFRESH_MIN_AGE
+
+        Returns:
+            按得分从高到低排列的型号列表
+        """
+        min_age = min_age if min_age is not None else config.REFRESH_MIN_AGE
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT part_number FROM hot_parts WHERE refreshed_at <= ? "
+                "ORDER BY (? - refreshed_at) / ? * (change_count + 1.0) / (refresh_count + 2.0) * (query_count + 1) DESC "
+                "LIMIT ?",
+                (now - min_age, now, max(config.CACHE_PRICE_TTL, 1), limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def record_refresh(self, part_number: str, part_data: Optional[Dict]):
+        """
+        记录一次刷新结果，价格或库存与上次不同时增加变化次数
+
+        Args:
+            part_number: 规范形式的型号
+            part_data: 刷新得到的产品数据，未找到时为None
+        """
+        fingerprint = volatile_fingerprint(part_data)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE hot_parts SET refreshed_at = ?, refresh_count = refresh_count + 1, "
+                "change_count = change_count + (CASE WHEN fingerprint != '' AND fingerprint != ? THEN 1 ELSE 0 END), "
+                "fingerprint = ? WHERE part_number = ?",
+                (time.time(), fingerprint, fingerprint, part_number),
+            )
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,109 @@
+import random
+import time
+import config
+import requests
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Optional
+
+
+def create_session(pool_size: Optional[int] = None) -> requests.Session:
+    """
+    创建复用连接的HTTP会话
+
+    Args:
+        pool_size: 连接池大小，默认为最大并发数加上提前搜索相似型号的线程数
+
+    Returns:
+        配置好keep-alive连接池和默认请求头的会话
+    """
+    if pool_size is None:
+        pool_size = config.MAX_CONCURRENCY + config.SPECULATIVE_WORKERS
+
+    session = requests.Session()
+    mount_pool(session, pool_size)
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    })
+    return session
+
+
+def mount_pool(session: requests.Session, pool_size: int):
+    """
+    为会话挂载容纳 pool_size 个连接的连接池，替换原有的连接池
+
+    连接池小于同时发送请求的线程数时，多出的连接用完即被丢弃，keep-alive失效。
+
+    Args:
+        session: HTTP会话
+        pool_size: 连接数
+    """
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+class RetryPolicy:
+    """
+    请求重试策略
+
+    采用带随机抖动的指数退避，429/503 响应优先遵循 Retry-After，
+    总尝试次数不超过 max_attempts。
+    """
+
+    # 可重试的状态码：限流和服务端错误
+    RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, max_attempts: Optional[int] = None, backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None):
+        self.max_attempts = max(1, max_attempts if max_attempts is not None else config.RETRY_MAX_ATTEMPTS)
+        self.backoff_base = backoff_base if backoff_base is not None else config.RETRY_BACKOFF_BASE
+        self.backoff_max = backoff_max if backoff_max is not None else config.RETRY_BACKOFF_MAX
+
+    def should_retry(self, status_code: int) -> bool:
+        """状态码是否值得重试"""
+        return status_code in self.RETRY_STATUS_CODES
+
+    def waits_too_long(self, retry_after: Optional[float]) -> bool:
+        """服务端要求的等待是否超过 backoff_max，此时不应原地等待，而应放弃这个密钥"""
+        return retry_after is not None and retry_after > self.backoff_max
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        计算第 attempt 次失败后（从0开始）的等待时间
+
+        Args:
+            attempt: 已失败的尝试序号
+            retry_after: 服务端通过 Retry-After 要求的等待秒数，不受 backoff_max 限制
+
+        Returns:
+            等待秒数
+        """
+        if retry_after is not None:
+            return max(retry_after, 0.0)
+        # 完全抖动：在 [0, base * 2^attempt] 内随机取值，避免并发请求同时重试
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """
+        解析 Retry-After 响应头
+
+        Args:
+            value: 响应头的值，可以是秒数或HTTP日期
+
+        Returns:
+            等待秒数，无法解析时返回None
+        """
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError):
+            return None
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import config
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from result_record import PartResult
+
+# 任务状态
+JOB_RUNNING = "running"
+JOB_FINISHED = "finished"
+
+# 导出结果时每次从数据库读取的行数
+READ_PAGE_SIZE = 1000
+
+
+class JobJournal:
+    """
+    批量查询任务日志（SQLite）
+
+    每完成一行就以 (任务ID, 输入位置) 为键写入结果，进程中断或页面刷新后
+    可以跳过已完成的位置继续查询，最终结果也可以直接从日志中按顺序导出。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, journal_mode: str = "WAL"):
+        self.db_path = db_path if db_path is not None else config.JOB_JOURNAL_PATH
+        self._lock = threading.Lock()
+        # 多个进程同时写入时等待锁释放，而不是立即报错
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            # 保存在网络文件系统上的分片队列结果需要使用 DELETE 模式
+            self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_rows (
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    result_json TEXT NOT NULL,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (job_id, position)
+                )
+                """
+            )
+
+    @staticmethod
+    def make_job_id(part_numbers: Iterable[str], namespace: str = "") -> str:
+        """
+        根据输入内容生成任务ID，相同命名空间内相同的元件列表得到相同的ID
+
+        Args:
+            part_numbers: 元件型号序列
+            namespace: 任务所属的命名空间，如API密钥的摘要，不同命名空间的任务互不续跑
+
+        Returns:
+            任务ID
+        """
+        digest = hashlib.sha1()
+        digest.update(namespace.encode("utf-8"))
+        digest.update(b"\0")
+        for part_number in part_numbers:
+            digest.update(part_number.encode("utf-8"))
+            digest.update(b"\n")
+        return digest.hexdigest()[:16]
+
+    def start_job(self, job_id: str) -> int:
+        """
+        开始或继续一个任务，已完成的任务会清空后重新开始
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            可以跳过的已完成行数
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None and row[0] == JOB_FINISHED:
+                self._conn.execute("DELETE FROM job_rows WHERE job_id = ?", (job_id,))
+            self._conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                (job_id, JOB_RUNNING, now, now),
+            )
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM job_rows WHERE job_id = ? AND failed = 0", (job_id,)
+            ).fetchone()[0]
+
+    def finish_job(self, job_id: str):
+        """将任务标记为已完成"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                (JOB_FINISHED, time.time(), job_id),
+            )
+
+    def reopen_job(self, job_id: str):
+        """将已完成的任务重新标记为进行中，保留已有结果（用于重新处理失败的分片）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                (JOB_RUNNING, time.time(), job_id),
+            )
+
+    def job_status(self, job_id: str) -> Optional[str]:
+        """返回任务状态，任务不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def completed_positions(self, job_id: str) -> Set[int]:
+        """返回任务中已成功完成的输入位置（查询出错的行在续跑时会重新查询）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position FROM job_rows WHERE job_id = ? AND failed = 0", (job_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def record_many(self, job_id: str, rows: List[Tuple[int, PartResult]]):
+        """
+        在一个事务中写入多行结果
+
+        Args:
+            job_id: 任务ID
+            rows: (输入位置, 查询结果) 列表
+        """
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_rows VALUES (?, ?, ?, ?)",
+                [
+                    (job_id, position, json.dumps(result.to_dict(), ensure_ascii=False),
+                     1 if result.failed else 0)
+                    for position, result in rows
+                ],
+            )
+
+    def iter_results(self, job_id: str) -> Iterator[PartResult]:
+        """
+        按输入顺序逐行读取任务结果
+
+        Args:
+            job_id: 任务ID
+
+        Yields:
+            查询结果
+        """
+        for _, result in self.iter_rows(job_id):
+            yield result
+
+    def iter_rows(self, job_id: str) -> Iterator[Tuple[int, PartResult]]:
+        """
+        按输入顺序逐行读取任务结果及其输入位置
+
+        Args:
+            job_id: 任务ID
+
+        Yields:
+            (输入位置, 查询结果) 元组
+        """
+        last_position = -1
+        while True:
+            # 分页读取，避免一次加载整个任务的结果
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT position, result_json FROM job_rows WHERE job_id = ? AND position > ? "
+                    "ORDER BY position LIMIT ?",
+                    (job_id, last_position, READ_PAGE_SIZE),
+                ).fetchall()
+            if not rows:
+                return
+            for position, result_json in rows:
+                yield position, PartResult.from_dict(json.loads(result_json))
+            last_position = rows[-1][0]
+
+    def delete_job(self, job_id: str):
+        """删除任务及其结果"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM job_rows WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
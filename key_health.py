@@ -0,0 +1,252 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import config
+from typing import Callable, Dict, List, Optional
+
+# 熔断器状态
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# 失败类型
+FAILURE_TRANSIENT = "transient"  # 限流、服务端错误、超时
+FAILURE_QUOTA = "quota"  # 当天配额用尽
+FAILURE_AUTH = "auth"  # 密钥无效或已停用
+
+# 配额按滚动的24小时统计
+QUOTA_WINDOW = 86400
+# 每记录多少次调用清理一次窗口外的记录
+PRUNE_INTERVAL = 500
+
+
+def classify_errors(errors: List[Dict]) -> Optional[str]:
+    """
+    判断Mouser响应中的 Errors 是否是密钥本身的问题
+
+    Args:
+        errors: 响应中的 Errors 列表
+
+    Returns:
+        FAILURE_AUTH 或 FAILURE_QUOTA，与密钥无关的错误返回None
+    """
+    text = " ".join(
+        f"{error.get('Code', '')} {error.get('Message', '')} {error.get('PropertyName', '')}"
+        for error in errors if isinstance(error, dict)
+    ).lower()
+    if any(word in text for word in ("too many", "exceeded", "maximum calls", "quota")):
+        return FAILURE_QUOTA
+    if any(word in text for word in ("api key", "apikey", "identifier", "unauthorized")):
+        return FAILURE_AUTH
+    return None
+
+
+class CircuitBreaker:
+    """
+    单个密钥的熔断器
+
+    连续失败达到 failure_threshold 次后断开，断开期间不再使用该密钥；
+    到期后进入半开状态，只放行一个探测请求，成功则恢复，失败则以加倍的时长重新断开。
+    配额用尽或密钥无效时直接按指定时长断开。
+    """
+
+    def __init__(self, failure_threshold: int, open_seconds: float, max_open_seconds: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.clock = clock
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.open_seconds = open_seconds
+        self.opened_until = 0.0
+        self.reason = ""
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def can_use(self) -> bool:
+        """是否可以向该密钥分配请求（不改变状态）"""
+        with self._lock:
+            return self._can_use()
+
+    def _can_use(self) -> bool:
+        if self.state == BREAKER_CLOSED:
+            return True
+        if self.state == BREAKER_OPEN:
+            return self.clock() >= self.opened_until
+        return not self._probing
+
+    def on_dispatch(self):
+        """请求分配给该密钥时调用，断开到期后转为半开并占用探测名额"""
+        with self._lock:
+            if self.state == BREAKER_OPEN and self.clock() >= self.opened_until:
+                self.state = BREAKER_HALF_OPEN
+            if self.state == BREAKER_HALF_OPEN:
+                self._probing = True
+
+    def retry_in(self) -> float:
+        """距离可以再次使用该密钥的秒数"""
+        with self._lock:
+            if self.state == BREAKER_OPEN:
+                return max(0.0, self.opened_until - self.clock())
+            return 0.0
+
+    def record_success(self):
+        with self._lock:
+            self.state = BREAKER_CLOSED
+            self.failures = 0
+            self.open_seconds = self.base_open_seconds
+            self.reason = ""
+            self._probing = False
+
+    def record_neutral(self):
+        """与密钥无关的错误，只释放探测名额"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self, reason: str, open_seconds: Optional[float] = None):
+        """
+        记录一次失败
+
+        Args:
+            reason: 失败原因
+            open_seconds: 指定时立即按该时长断开（配额用尽、密钥无效）
+        """
+        with self._lock:
+            self._probing = False
+            self.failures += 1
+            self.reason = reason
+            if open_seconds is not None:
+                self._open(open_seconds)
+            elif self.state == BREAKER_HALF_OPEN:
+                # 探测失败，断开时间加倍
+                self.open_seconds = min(self.max_open_seconds, self.open_seconds * 2)
+                self._open(self.open_seconds)
+            elif self.failures >= self.failure_threshold:
+                self._open(self.open_seconds)
+
+    def _open(self, seconds: float):
+        self.state = BREAKER_OPEN
+        self.opened_until = self.clock() + seconds
+
+
+class KeyHealth:
+    """
+    API密钥的配额统计和熔断状态
+
+    每次请求都记录到SQLite中，按滚动的24小时统计各密钥已用的次数，程序重启后仍然有效；
+    数据库中只保存密钥的摘要，不保存密钥本身。熔断状态只保存在内存中。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.db_path = db_path if db_path is not None else config.KEY_USAGE_PATH
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._calls_since_prune = 0
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS key_calls (key_id TEXT NOT NULL, called_at REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_key_calls ON key_calls (key_id, called_at)")
+
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        """密钥的摘要，用作数据库中的标识"""
+        return hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:16]
+
+    def breaker(self, api_key: str) -> CircuitBreaker:
+        """返回密钥的熔断器，不存在时创建"""
+        with self._lock:
+            breaker = self._breakers.get(api_key)
+            if breaker is None:
+                breaker = CircuitBreaker(config.KEY_BREAKER_FAILURES, config.KEY_BREAKER_OPEN_SECONDS,
+                                         config.KEY_BREAKER_MAX_OPEN_SECONDS)
+                self._breakers[api_key] = breaker
+            return breaker
+
+    def used_today(self, api_key: str) -> int:
+        """密钥在最近24小时内已发送的请求数"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM key_calls WHERE key_id = ? AND called_at > ?",
+                (self.key_id(api_key), self.clock() - QUOTA_WINDOW),
+            ).fetchone()[0]
+
+    def record_call(self, api_key: str):
+        """记录一次发送给Mouser的请求"""
+        now = self.clock()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO key_calls VALUES (?, ?)", (self.key_id(api_key), now))
+            self._calls_since_prune += 1
+            if self._calls_since_prune >= PRUNE_INTERVAL:
+                self._calls_since_prune = 0
+                self._conn.execute("DELETE FROM key_calls WHERE called_at <= ?", (now - QUOTA_WINDOW,))
+
+    def quota_reset_in(self, api_key: str) -> Optional[float]:
+        """
+        按本地记录估计密钥下一次有配额可用的秒数
+
+        Returns:
+            窗口内最早一次请求离开窗口的剩余秒数，没有记录时返回None
+        """
+        now = self.clock()
+        with self._lock:
+            oldest = self._conn.execute(
+                "SELECT MIN(called_at) FROM key_calls WHERE key_id = ? AND called_at > ?",
+                (self.key_id(api_key), now - QUOTA_WINDOW),
+            ).fetchone()[0]
+        if oldest is None:
+            return None
+        return max(0.0, oldest + QUOTA_WINDOW - now)
+
+    def record_success(self, api_key: str):
+        self.breaker(api_key).record_success()
+
+    def record_neutral(self, api_key: str):
+        self.breaker(api_key).record_neutral()
+
+    def record_failure(self, api_key: str, kind: str, reason: str = "", open_seconds: Optional[float] = None):
+        """
+        记录一次与密钥有关的失败
+
+        Args:
+            api_key: API密钥
+            kind: 失败类型，FAILURE_TRANSIENT / FAILURE_QUOTA / FAILURE_AUTH
+            reason: 失败原因
+            open_seconds: 指定时立即按该时长断开，如服务端通过 Retry-After 要求的等待
+        """
+        breaker = self.breaker(api_key)
+        if open_seconds is not None:
+            breaker.record_failure(reason, open_seconds)
+        elif kind == FAILURE_AUTH:
+            breaker.record_failure(reason, config.KEY_AUTH_COOLDOWN)
+        elif kind == FAILURE_QUOTA:
+            # 配额用尽时断开到滚动窗口中最早的请求过期为止
+            reset_in = self.quota_reset_in(api_key)
+            breaker.record_failure(reason, reset_in if reset_in else config.KEY_QUOTA_COOLDOWN)
+        else:
+            breaker.record_failure(reason)
+
+    def states(self, api_keys: List[str]) -> Dict[str, str]:
+        """返回各密钥的熔断状态"""
+        return {api_key: self.breaker(api_key).state for api_key in api_keys}
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+_shared_health: Optional[KeyHealth] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_key_health() -> KeyHealth:
+    """进程内共享的密钥状态，同一密钥在不同会话中的失败会互相影响"""
+    global _shared_health
+    with _shared_lock:
+        if _shared_health is None:
+            _shared_health = KeyHealth()
+        return _shared_health
@@ -0,0 +1,71 @@
+import json
+from typing import Dict, List
+
+# 安装了 orjson 时使用它解析响应，速度比标准库快数倍；没有安装时回退到 json
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# 程序实际使用的产品字段，其余字段（描述、图片、规格参数、合规信息等）解析后立即丢弃
+PART_FIELDS = (
+    "MouserPartNumber",
+    "ManufacturerPartNumber",
+    "Manufacturer",
+    "PriceBreaks",
+    # 没有价格阶梯时 PriceTable 使用的单价和最小起订量
+    "Price",
+    "Min",
+    "Availability",
+    "LifecycleStatus",
+    "SuggestedReplacement",
+)
+# 价格阶梯中使用的字段
+PRICE_BREAK_FIELDS = ("Quantity", "Price", "Currency")
+
+
+def compact_part(part: Dict) -> Dict:
+    """
+    只保留产品数据中用到的字段
+
+    Args:
+        part: Mouser返回的完整产品数据
+
+    Returns:
+        精简后的产品数据，缺少的字段不出现在结果中
+    """
+    record = {field: part[field] for field in PART_FIELDS if part.get(field) is not None}
+    price_breaks = record.get("PriceBreaks")
+    if isinstance(price_breaks, list):
+        record["PriceBreaks"] = [
+            {field: price_break[field] for field in PRICE_BREAK_FIELDS if field in price_break}
+            for price_break in price_breaks if isinstance(price_break, dict)
+        ]
+    return record
+
+
+def decode_search_response(content: bytes) -> Dict:
+    """
+    直接从响应字节解析搜索结果，只保留错误信息、结果数量和精简后的产品列表
+
+    Args:
+        content: HTTP响应体
+
+    Returns:
+        与Mouser响应结构相同的字典，格式错误时抛出 ValueError
+    """
+    data = _loads(content)
+    if not isinstance(data, dict):
+        raise ValueError("响应不是JSON对象")
+
+    search_results = data.get("SearchResults")
+    if not isinstance(search_results, dict):
+        return {"Errors": data.get("Errors"), "SearchResults": search_results}
+
+    parts: List[Dict] = [compact_part(part) for part in search_results.get("Parts") or [] if isinstance(part, dict)]
+    return {
+        "Errors": data.get("Errors"),
+        "SearchResults": {"NumberOfResult": search_results.get("NumberOfResult", len(parts)), "Parts": parts},
+    }
@@ -3,15 +3,469 @@
 
 """
 贸泽电子元器件价格爬虫主程序
+
+不带参数运行时启动Streamlit应用；使用 batch 子命令在命令行中批量查询:
+
+    python main.py batch 元件列表.txt -o 贸泽电子元件价格查询结果.xlsx --concurrency 8
+    python main.py cost 元件列表.txt --builds 100,1k,10k
+
+超大批量时可以切分到分片队列，由多个工作进程（可以在不同主机上）同时处理:
+
+    python main.py enqueue 元件列表.txt --shard-size 500
+    python main.py worker --key-slice 0/3
+    python main.py export <任务ID> -o 贸泽电子元件价格查询结果.xlsx
+    python main.py requeue <任务ID>
+
+在低峰时段提前刷新常用型号的价格和库存，白天的查询直接命中缓存:
+
+    python main.py refresh --seed 元件列表.txt --loop
 """
 
+import argparse
+import hashlib
 import subprocess
 import sys
 import os
+import time
 
-def main():
+def run_streamlit():
     # 运行Streamlit应用
     subprocess.run([sys.executable, "-m", "streamlit", "run", "streamlit_app.py"])
 
+def read_api_keys(key_file):
+    """从文件读取API密钥，每行一个，忽略空行和 # 开头的注释"""
+    with open(key_file, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+def select_api_keys(args):
+    """按 --key-file 或 --key-slice 选择本进程使用的API密钥"""
+    import config
+
+    api_keys = read_api_keys(args.key_file) if args.key_file else config.MOUSER_API_KEYS
+    key_slice = getattr(args, "key_slice", None)
+    if key_slice:
+        # "i/n" 表示取第 i 份（从0开始，共 n 份），不同工作进程使用互不重叠的密钥
+        index, count = (int(value) for value in key_slice.split("/"))
+        api_keys = api_keys[index::count]
+    return api_keys
+
+def iter_input_components(input_path):
+    """根据扩展名逐行读取输入文件中的元件型号"""
+    from excel_handler import ExcelHandler
+
+    if input_path.endswith('.xlsx'):
+        return ExcelHandler.iter_components_from_excel(input_path)
+    if input_path.endswith('.txt'):
+        return ExcelHandler.iter_components_from_txt(input_path)
+    raise ValueError(f"不支持的文件格式: {input_path}，请使用.xlsx或.txt文件")
+
+def file_job_id(input_path):
+    """根据输入文件内容生成任务ID，同一文件再次运行时续跑未完成的任务"""
+    digest = hashlib.sha1()
+    with open(input_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+class ProgressReporter:
+    """向stderr输出进度和吞吐量，最多每秒输出一次"""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.start_time = time.time()
+        self.last_report = 0.0
+        self.completed = 0
+
+    def __call__(self, completed, component):
+        self.completed = completed
+        now = time.time()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(component)
+
+    def report(self, component=""):
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        sys.stderr.write(f"已完成 {self.completed} 个 ({self.completed / elapsed:.1f} 个/秒) {component}\n")
+        sys.stderr.flush()
+
+def run_batch(args):
+    """命令行批量查询，不依赖Streamlit"""
+    from async_engine import AsyncLookupEngine
+    from excel_handler import ExcelHandler
+    from job_journal import JobJournal
+    from metrics import shared_metrics
+    from fuzzy_index import PartIndex
+    from hot_set import HotSet
+    from mouser_api import MouserAPI
+    from response_cache import ResponseCache
+
+    api_keys = select_api_keys(args)
+    if not api_keys:
+        sys.stderr.write("没有可用的API密钥\n")
+        return 1
+
+    if args.metrics_port:
+        shared_metrics.start_http_server(args.metrics_port)
+        sys.stderr.write(f"运行指标: http://localhost:{args.metrics_port}/metrics\n")
+
+    cache = None if args.no_cache else ResponseCache(args.cache)
+    part_index = None if args.no_cache else PartIndex(args.cache)
+    hot_set = None if args.no_cache else HotSet(args.cache)
+    mouser_api = MouserAPI(api_keys, cache=cache, part_index=part_index, hot_set=hot_set)
+    engine = AsyncLookupEngine(mouser_api, args.concurrency, args.batch_size)
+
+    journal = None
+    job_id = None
+    if not args.no_journal:
+        journal = JobJournal(args.journal)
+        job_id = args.job_id or file_job_id(args.input)
+        sys.stderr.write(f"任务ID: {job_id}\n")
+
+    reporter = ProgressReporter()
+    results = engine.run(iter_input_components(args.input), reporter, journal, job_id)
+    reporter.report()
+
+    # 使用任务日志时直接从日志流式导出，否则导出内存中的结果
+    export_rows = journal.iter_results(job_id) if journal is not None else results
+    if args.output.endswith('.csv'):
+        ExcelHandler.export_results_csv(export_rows, args.output)
+    else:
+        ExcelHandler.export_results_streaming(export_rows, args.output)
+
+    not_found = sum(1 for result in results if result.remark == "未找到")
+    sys.stderr.write(f"查询完成，共 {len(results)} 个元件，未找到 {not_found} 个，"
+                     f"耗时 {time.time() - reporter.start_time:.1f} 秒\n")
+
+    snapshot = shared_metrics.snapshot()
+    sys.stderr.write(f"相似型号回退率 {snapshot['fallback_rate']:.1%}，缓存命中率 {snapshot['cache_hit_rate']:.1%}，"
+                     f"重试 {snapshot['retries']} 次，429 {snapshot['throttled']} 次\n")
+    if args.metrics_file:
+        shared_metrics.write_prometheus(args.metrics_file)
+    return 0
+
+def run_cost(args):
+    """根据任务日志中保存的价格阶梯计算不同生产数量下的BOM成本，不发送网络请求"""
+    import csv
+    from bom_costing import bom_currency, cost_matrix, parse_build_quantities, price_table_from_results
+    from job_journal import JobJournal
+
+    if not args.input and not args.job_id:
+        sys.stderr.write("请提供输入文件或 --job-id\n")
+        return 2
+    job_id = args.job_id or file_job_id(args.input)
+    results = list(JobJournal(args.journal).iter_results(job_id))
+    if not results:
+        sys.stderr.write(f"任务 {job_id} 没有查询结果，请先运行 batch 命令\n")
+        return 1
+
+    build_quantities = parse_build_quantities(args.builds)
+    price_table = price_table_from_results(results)
+    try:
+        currency = bom_currency(price_table)
+    except ValueError as e:
+        sys.stderr.write(f"{str(e)}\n")
+        return 1
+    unit = f"({currency})" if currency else ""
+    _, line_costs = cost_matrix(price_table, build_quantities)
+    totals = line_costs.sum(axis=0)
+    for quantity, total in zip(build_quantities, totals):
+        print(f"生产 {quantity} 套: BOM总价 {total:,.2f}{unit}，单套成本 {total / quantity:,.4f}{unit}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["元件型号"] + [f"{quantity}套金额{unit}" for quantity in build_quantities])
+            for result, costs in zip(results, line_costs):
+                writer.writerow([result.component] + [round(cost, 5) for cost in costs])
+        sys.stderr.write(f"成本明细已写入: {args.output}\n")
+    return 0
+
+def run_enqueue(args):
+    """将输入文件切分成分片写入队列"""
+    import config
+    from job_journal import JobJournal
+    from work_queue import WorkQueue
+
+    job_id = args.job_id or file_job_id(args.input)
+    queue = WorkQueue(args.queue)
+    if job_id in queue.job_ids():
+        # 已在队列中的任务不重复写入，也不清空已有结果
+        sys.stderr.write(f"任务已在队列中: {queue.progress(job_id)}\n")
+    else:
+        shard_count = queue.enqueue(job_id, iter_input_components(args.input), args.shard_size)
+        JobJournal(args.journal or args.queue, config.WORK_QUEUE_JOURNAL_MODE).start_job(job_id)
+        sys.stderr.write(f"已写入 {shard_count} 个分片\n")
+    print(job_id)
+    return 0
+
+def run_worker(args):
+    """从分片队列领取分片并查询，可以在多个进程或主机上同时运行"""
+    import config
+    import socket
+    from async_engine import AsyncLookupEngine
+    from job_journal import JOB_FINISHED, JobJournal
+    from fuzzy_index import PartIndex
+    from mouser_api import MouserAPI
+    from response_cache import ResponseCache
+    from work_queue import SHARD_FAILED, LeaseLostError, WorkQueue
+
+    api_keys = select_api_keys(args)
+    if not api_keys:
+        sys.stderr.write("没有可用的API密钥\n")
+        return 1
+
+    queue = WorkQueue(args.queue)
+    journal = JobJournal(args.journal or args.queue, config.WORK_QUEUE_JOURNAL_MODE)
+    cache = None if args.no_cache else ResponseCache(args.cache)
+    part_index = None if args.no_cache else PartIndex(args.cache)
+    mouser_api = MouserAPI(api_keys, cache=cache, part_index=part_index)
+    engine = AsyncLookupEngine(mouser_api, args.concurrency, args.batch_size)
+    worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    def finish_if_done(job_id):
+        # 最后一个分片可能是完成，也可能是尝试次数用尽被标记为失败，两种情况都要结束任务
+        if queue.job_finished(job_id) and journal.job_status(job_id) != JOB_FINISHED:
+            journal.finish_job(job_id)
+            failed_shards = queue.progress(job_id)[SHARD_FAILED]
+            if failed_shards:
+                sys.stderr.write(f"[{worker_id}] 任务 {job_id} 已结束，{failed_shards} 个分片失败，"
+                                 f"可用 requeue 命令重新处理\n")
+            else:
+                sys.stderr.write(f"[{worker_id}] 任务 {job_id} 的全部分片已完成\n")
+
+    processed = 0
+    while True:
+        shard = queue.claim(worker_id, args.lease, args.job_id)
+        if shard is None:
+            # 其他进程还持有租约时继续等待，租约过期的分片会被重新领取
+            if args.wait and queue.unfinished_count(args.job_id):
+                time.sleep(config.WORK_QUEUE_POLL_INTERVAL)
+                continue
+            # 租约过期后尝试次数用尽的分片在领取时被标记为失败，检查任务是否因此结束
+            for job_id in ([args.job_id] if args.job_id else queue.job_ids()):
+                finish_if_done(job_id)
+            break
+
+        sys.stderr.write(f"[{worker_id}] 领取分片 {shard.job_id}#{shard.shard_index}，"
+                         f"{len(shard.components)} 个元件\n")
+        last_renew = time.time()
+
+        def renew_lease(completed, component):
+            # 处理时间较长时定期续租，避免分片被其他进程重复领取
+            nonlocal last_renew
+            if time.time() - last_renew >= args.lease / 3:
+                last_renew = time.time()
+                if not queue.renew(shard, args.lease):
+                    # 租约已过期并被其他进程领取，放弃这个分片
+                    raise LeaseLostError(f"分片 {shard.job_id}#{shard.shard_index} 的租约已失效")
+
+        try:
+            results = engine.run(shard.components, renew_lease)
+            journal.record_many(shard.job_id, [(shard.start_position + offset, result)
+                                               for offset, result in enumerate(results)])
+        except Exception as e:
+            sys.stderr.write(f"[{worker_id}] 分片 {shard.job_id}#{shard.shard_index} 处理失败: {str(e)}\n")
+            queue.release(shard)
+            finish_if_done(shard.job_id)
+            continue
+
+        # 出错的行（网络错误、重试用尽、密钥不可用）不能算作完成，放回队列重新查询，
+        # 已查到的行写入了缓存，重新查询时不会再请求API
+        failed = sum(1 for result in results if result.failed)
+        if failed:
+            keys_unavailable = mouser_api.rate_limiter.wait_time() > config.KEY_MAX_WAIT
+            queue.release(shard, count_attempt=not keys_unavailable)
+            sys.stderr.write(f"[{worker_id}] 分片 {shard.job_id}#{shard.shard_index} 有 {failed} 个元件查询出错，"
+                             f"已放回队列\n")
+            finish_if_done(shard.job_id)
+            if keys_unavailable:
+                # 继续领取只会把其余分片也查成错误，停止本进程
+                sys.stderr.write(f"[{worker_id}] 所有API密钥都不可用，停止领取分片，共处理 {processed} 个元件\n")
+                return 1
+            continue
+
+        if not queue.complete(shard):
+            sys.stderr.write(f"[{worker_id}] 分片 {shard.job_id}#{shard.shard_index} 的租约已失效，"
+                             f"由其他进程完成\n")
+            continue
+
+        processed += len(results)
+        finish_if_done(shard.job_id)
+
+    sys.stderr.write(f"[{worker_id}] 队列中没有可领取的分片，共处理 {processed} 个元件\n")
+    return 0
+
+def run_queue_status(args):
+    """显示队列中各任务的分片进度"""
+    from work_queue import WorkQueue
+
+    queue = WorkQueue(args.queue)
+    queue.requeue_expired()
+    job_ids = [args.job_id] if args.job_id else queue.job_ids()
+    for job_id in job_ids:
+        counts = queue.progress(job_id)
+        print(f"{job_id}: 待领取 {counts['pending']}，处理中 {counts['leased']}，"
+              f"已完成 {counts['done']}，失败 {counts['failed']}")
+    return 0
+
+def run_requeue(args):
+    """将任务中失败的分片放回队列，已完成的结果保留"""
+    import config
+    from job_journal import JobJournal
+    from work_queue import WorkQueue
+
+    reset = WorkQueue(args.queue).reset_failed(args.job_id)
+    if reset:
+        JobJournal(args.journal or args.queue, config.WORK_QUEUE_JOURNAL_MODE).reopen_job(args.job_id)
+    sys.stderr.write(f"已将 {reset} 个失败的分片放回队列\n")
+    return 0
+
+def run_export(args):
+    """将任务日志中的结果导出为Excel或CSV文件"""
+    import config
+    from excel_handler import ExcelHandler
+    from job_journal import JobJournal
+
+    rows = JobJournal(args.journal, config.WORK_QUEUE_JOURNAL_MODE).iter_results(args.job_id)
+    if args.output.endswith('.csv'):
+        ExcelHandler.export_results_csv(rows, args.output)
+    else:
+        ExcelHandler.export_results_streaming(rows, args.output)
+    return 0
+
+def run_refresh(args):
+    """导入历史输入文件中的型号，并刷新常用型号的缓存"""
+    from fuzzy_index import PartIndex
+    from hot_set import HotSet
+    from mouser_api import MouserAPI
+    from refresher import BackgroundRefresher
+    from response_cache import ResponseCache
+    from scheduler import PRIORITY_BACKGROUND
+
+    hot_set = HotSet(args.cache)
+    for seed_path in args.seed:
+        hot_set.record(iter_input_components(seed_path))
+    sys.stderr.write(f"常用型号 {len(hot_set)} 个\n")
+
+    api_keys = select_api_keys(args)
+    if not api_keys:
+        sys.stderr.write("没有可用的API密钥\n")
+        return 1
+
+    mouser_api = MouserAPI(api_keys, cache=ResponseCache(args.cache), part_index=PartIndex(args.cache),
+                           priority=PRIORITY_BACKGROUND)
+    refresher = BackgroundRefresher(mouser_api, hot_set, args.limit)
+    if args.loop:
+        try:
+            refresher.run_forever(args.interval, args.any_time)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    refreshed = refresher.refresh_once()
+    sys.stderr.write(f"刷新了 {refreshed} 个型号\n")
+    return 0
+
+def build_parser():
+    import config
+
+    parser = argparse.ArgumentParser(description="贸泽电子元器件价格爬虫")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="命令行批量查询，结果写入Excel或CSV文件")
+    batch_parser.add_argument("input", help="输入文件（.txt 每行一个型号，或 .xlsx）")
+    batch_parser.add_argument("-o", "--output", default=config.OUTPUT_EXCEL_RESULT,
+                              help="结果文件（.xlsx 或 .csv）")
+    batch_parser.add_argument("--concurrency", type=int, default=config.MAX_CONCURRENCY,
+                              help="同时进行的查询数量")
+    batch_parser.add_argument("--batch-size", type=int, default=config.MOUSER_BATCH_SIZE,
+                              help="单个请求合并的型号数量")
+    batch_parser.add_argument("--cache", default=config.CACHE_DB_PATH, help="本地缓存数据库文件")
+    batch_parser.add_argument("--no-cache", action="store_true", help="不使用本地缓存")
+    batch_parser.add_argument("--key-file", help="API密钥文件，每行一个密钥（默认使用config.py中的密钥）")
+    batch_parser.add_argument("--key-slice", help="只使用密钥中的第 i 份，格式 i/n，如 0/3")
+    batch_parser.add_argument("--journal", default=config.JOB_JOURNAL_PATH,
+                              help="任务日志数据库文件，中断后再次运行同一输入会跳过已完成的行")
+    batch_parser.add_argument("--job-id", help="任务ID（默认根据输入文件内容生成）")
+    batch_parser.add_argument("--no-journal", action="store_true", help="不记录任务日志")
+    batch_parser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT,
+                              help="在该端口提供 Prometheus 格式的 /metrics 接口")
+    batch_parser.add_argument("--metrics-file", help="查询结束后将运行指标写入该文件（Prometheus 文本格式）")
+    batch_parser.set_defaults(handler=run_batch)
+
+    cost_parser = subparsers.add_parser("cost", help="根据已完成任务的价格阶梯计算不同生产数量下的BOM成本")
+    cost_parser.add_argument("input", nargs="?", help="batch 命令使用的输入文件，用于确定任务ID")
+    cost_parser.add_argument("--job-id", help="任务ID（默认根据输入文件内容生成）")
+    cost_parser.add_argument("--builds", default="100,1k,10k", help="生产数量，用逗号分隔，支持k/w表示千/万")
+    cost_parser.add_argument("--journal", default=config.JOB_JOURNAL_PATH, help="任务日志数据库文件")
+    cost_parser.add_argument("-o", "--output", help="成本明细CSV文件")
+    cost_parser.set_defaults(handler=run_cost)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="将输入文件切分成分片写入队列，由 worker 处理")
+    enqueue_parser.add_argument("input", help="输入文件（.txt 每行一个型号，或 .xlsx）")
+    enqueue_parser.add_argument("--job-id", help="任务ID（默认根据输入文件内容生成）")
+    enqueue_parser.add_argument("--shard-size", type=int, default=config.WORK_QUEUE_SHARD_SIZE,
+                                help="每个分片的元件数量")
+    enqueue_parser.add_argument("--queue", default=config.WORK_QUEUE_PATH, help="分片队列数据库文件")
+    enqueue_parser.add_argument("--journal", help="保存结果的任务日志数据库文件（默认与队列相同）")
+    enqueue_parser.set_defaults(handler=run_enqueue)
+
+    worker_parser = subparsers.add_parser("worker", help="从分片队列领取分片并查询")
+    worker_parser.add_argument("--queue", default=config.WORK_QUEUE_PATH, help="分片队列数据库文件")
+    worker_parser.add_argument("--journal", help="保存结果的任务日志数据库文件（默认与队列相同）")
+    worker_parser.add_argument("--job-id", help="只处理该任务的分片")
+    worker_parser.add_argument("--worker-id", help="工作进程标识（默认为 主机名-进程号）")
+    worker_parser.add_argument("--lease", type=float, default=config.WORK_QUEUE_LEASE_SECONDS,
+                               help="分片租约时长(秒)，超时未完成的分片会被重新领取")
+    worker_parser.add_argument("--wait", action="store_true", help="其他进程仍有未完成的分片时继续等待")
+    worker_parser.add_argument("--concurrency", type=int, default=config.MAX_CONCURRENCY,
+                               help="同时进行的查询数量")
+    worker_parser.add_argument("--batch-size", type=int, default=config.MOUSER_BATCH_SIZE,
+                               help="单个请求合并的型号数量")
+    worker_parser.add_argument("--cache", default=config.CACHE_DB_PATH, help="本地缓存数据库文件")
+    worker_parser.add_argument("--no-cache", action="store_true", help="不使用本地缓存")
+    worker_parser.add_argument("--key-file", help="API密钥文件，每行一个密钥（默认使用config.py中的密钥）")
+    worker_parser.add_argument("--key-slice", help="只使用密钥中的第 i 份，格式 i/n，如 0/3")
+    worker_parser.set_defaults(handler=run_worker)
+
+    status_parser = subparsers.add_parser("queue-status", help="显示分片队列中各任务的进度")
+    status_parser.add_argument("--queue", default=config.WORK_QUEUE_PATH, help="分片队列数据库文件")
+    status_parser.add_argument("--job-id", help="只显示该任务")
+    status_parser.set_defaults(handler=run_queue_status)
+
+    requeue_parser = subparsers.add_parser("requeue", help="将任务中失败的分片放回队列重新处理")
+    requeue_parser.add_argument("job_id", help="任务ID")
+    requeue_parser.add_argument("--queue", default=config.WORK_QUEUE_PATH, help="分片队列数据库文件")
+    requeue_parser.add_argument("--journal", help="保存结果的任务日志数据库文件（默认与队列相同）")
+    requeue_parser.set_defaults(handler=run_requeue)
+
+    export_parser = subparsers.add_parser("export", help="将任务日志中的结果导出为Excel或CSV文件")
+    export_parser.add_argument("job_id", help="任务ID")
+    export_parser.add_argument("-o", "--output", default=config.OUTPUT_EXCEL_RESULT,
+                               help="结果文件（.xlsx 或 .csv）")
+    export_parser.add_argument("--journal", default=config.WORK_QUEUE_PATH, help="任务日志数据库文件")
+    export_parser.set_defaults(handler=run_export)
+
+    refresh_parser = subparsers.add_parser("refresh", help="按陈旧程度和变化频率刷新常用型号的缓存")
+    refresh_parser.add_argument("--seed", nargs="*", default=[],
+                                help="先将这些输入文件中的型号加入常用型号（.txt 或 .xlsx）")
+    refresh_parser.add_argument("--limit", type=int, default=config.REFRESH_MAX_PARTS, help="每轮最多刷新的型号数量")
+    refresh_parser.add_argument("--loop", action="store_true", help="持续运行，在低峰时段定期刷新")
+    refresh_parser.add_argument("--interval", type=float, default=config.REFRESH_INTERVAL,
+                                help="持续运行时两轮刷新之间的间隔(秒)")
+    refresh_parser.add_argument("--any-time", action="store_true", help="持续运行时不限于低峰时段")
+    refresh_parser.add_argument("--cache", default=config.CACHE_DB_PATH, help="本地缓存数据库文件")
+    refresh_parser.add_argument("--key-file", help="API密钥文件，每行一个密钥（默认使用config.py中的密钥）")
+    refresh_parser.set_defaults(handler=run_refresh)
+
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    if args.command is None:
+        run_streamlit()
+        return 0
+    return args.handler(args)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
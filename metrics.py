@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+# 请求耗时直方图的桶上限(秒)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 查询结果类型
+LOOKUP_EXACT = "exact"
+LOOKUP_SIMILAR = "similar"
+LOOKUP_NOT_FOUND = "not_found"
+LOOKUP_ERROR = "error"
+
+
+def mask_key(api_key: str) -> str:
+    """隐藏API密钥，只保留最后4位用于区分"""
+    return f"****{api_key[-4:]}" if len(api_key) > 4 else "****"
+
+
+class Histogram:
+    """累积直方图"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for index, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, ratio: float) -> float:
+        """按桶估算分位数，返回所在桶的上限"""
+        if self.count == 0:
+            return 0.0
+        target = ratio * self.count
+        cumulative = 0
+        for index, upper in enumerate(self.buckets):
+            cumulative += self.counts[index]
+            if cumulative >= target:
+                return upper
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    运行指标
+
+    记录每个密钥的请求数（按状态）、请求耗时直方图、重试和429次数、
+    查询结果类型（精确/相似型号/未找到/错误）以及缓存命中情况。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests: Dict[Tuple[str, str], int] = {}
+        self.latency: Dict[str, Histogram] = {}
+        self.retries = 0
+        self.throttled = 0
+        self.lookups: Dict[str, int] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.key_tokens: Dict[str, float] = {}
+        self.key_concurrency: Dict[str, float] = {}
+
+    def record_request(self, api_key: str, status: str, seconds: float):
+        """
+        记录一次HTTP请求
+
+        Args:
+            api_key: 使用的API密钥
+            status: HTTP状态码，或 "timeout" / "error"
+            seconds: 请求耗时
+        """
+        key = mask_key(api_key)
+        with self._lock:
+            self.requests[(key, status)] = self.requests.get((key, status), 0) + 1
+            self.latency.setdefault(key, Histogram()).observe(seconds)
+            if status == "429":
+                self.throttled += 1
+
+    def record_retry(self):
+        """记录一次重试"""
+        with self._lock:
+            self.retries += 1
+
+    def record_lookup(self, outcome: str, count: int = 1):
+        """记录查询结果类型"""
+        with self._lock:
+            self.lookups[outcome] = self.lookups.get(outcome, 0) + count
+
+    def record_cache(self, hit: bool):
+        """记录一次缓存查找"""
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def set_key_tokens(self, api_key: str, tokens: float):
+        """记录密钥当天剩余的请求次数"""
+        with self._lock:
+            self.key_tokens[mask_key(api_key)] = tokens
+
+    def set_key_concurrency(self, api_key: str, limit: float):
+        """记录密钥当前的自适应并发上限"""
+        with self._lock:
+            self.key_concurrency[mask_key(api_key)] = limit
+
+    def snapshot(self) -> Dict:
+        """
+        返回当前指标的汇总
+
+        Returns:
+            包含每个密钥的请求数、耗时分位数、剩余次数以及回退率和缓存命中率的字典
+        """
+        with self._lock:
+            keys = sorted({key for key, _ in self.requests} | set(self.key_tokens))
+            per_key = []
+            for key in keys:
+                statuses = {status: count for (name, status), count in self.requests.items() if name == key}
+                histogram = self.latency.get(key, Histogram())
+                per_key.append({
+                    "key": key,
+                    "requests": sum(statuses.values()),
+                    "statuses": statuses,
+                    "p50_seconds": histogram.quantile(0.5),
+                    "p99_seconds": histogram.quantile(0.99),
+                    "tokens_today": self.key_tokens.get(key),
+                    "concurrency_limit": self.key_concurrency.get(key)
+                })
+
+            lookups = dict(self.lookups)
+            total_lookups = sum(lookups.values())
+            cache_total = self.cache_hits + self.cache_misses
+            return {
+                "uptime_seconds": time.time() - self.started_at,
+                "keys": per_key,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "lookups": lookups,
+                "fallback_rate": lookups.get(LOOKUP_SIMILAR, 0) / total_lookups if total_lookups else 0.0,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_rate": self.cache_hits / cache_total if cache_total else 0.0
+            }
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式输出全部指标"""
+        lines: List[str] = []
+        with self._lock:
+            lines.append("# HELP mouser_requests_total Mouser API requests by key and status")
+            lines.append("# TYPE mouser_requests_total counter")
+            for (key, status), count in sorted(self.requests.items()):
+                lines.append(f'mouser_requests_total{{key="{key}",status="{status}"}} {count}')
+
+            lines.append("# HELP mouser_request_duration_seconds Mouser API request latency")
+            lines.append("# TYPE mouser_request_duration_seconds histogram")
+            for key, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for upper, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'mouser_request_duration_seconds_bucket{{key="{key}",le="{upper}"}} {cumulative}')
+                lines.append(f'mouser_request_duration_seconds_bucket{{key="{key}",le="+Inf"}} {histogram.count}')
+                lines.append(f'mouser_request_duration_seconds_sum{{key="{key}"}} {histogram.total}')
+                lines.append(f'mouser_request_duration_seconds_count{{key="{key}"}} {histogram.count}')
+
+            lines.append("# HELP mouser_key_tokens_remaining Requests left in the key's daily budget")
+            lines.append("# TYPE mouser_key_tokens_remaining gauge")
+            for key, tokens in sorted(self.key_tokens.items()):
+                lines.append(f'mouser_key_tokens_remaining{{key="{key}"}} {tokens}')
+
+            lines.append("# HELP mouser_key_concurrency_limit Adaptive in-flight request limit of the key")
+            lines.append("# TYPE mouser_key_concurrency_limit gauge")
+            for key, limit in sorted(self.key_concurrency.items()):
+                lines.append(f'mouser_key_concurrency_limit{{key="{key}"}} {limit}')
+
+            lines.append("# TYPE mouser_retries_total counter")
+            lines.append(f"mouser_retries_total {self.retries}")
+            lines.append("# TYPE mouser_throttled_total counter")
+            lines.append(f"mouser_throttled_total {self.throttled}")
+
+            lines.append("# HELP mouser_lookups_total Component lookups by outcome")
+            lines.append("# TYPE mouser_lookups_total counter")
+            for outcome, count in sorted(self.lookups.items()):
+                lines.append(f'mouser_lookups_total{{outcome="{outcome}"}} {count}')
+
+            lines.append("# TYPE mouser_cache_requests_total counter")
+            lines.append(f'mouser_cache_requests_total{{result="hit"}} {self.cache_hits}')
+            lines.append(f'mouser_cache_requests_total{{result="miss"}} {self.cache_misses}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, file_path: str):
+        """将指标写入文件（先写临时文件再替换，供 node_exporter 文本收集器读取）"""
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, file_path)
+
+    def start_http_server(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """
+        在后台线程中启动 /metrics 接口
+
+        Args:
+            port: 监听端口
+            host: 监听地址
+
+        Returns:
+            已启动的HTTP服务器
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# 进程内共享的指标
+shared_metrics = MetricsRegistry()
@@ -1,32 +1,82 @@
 import requests
 import time
 import config
+from concurrent.futures import Future, ThreadPoolExecutor
+from scheduler import PRIORITY_BATCH, RequestScheduler, get_shared_scheduler
+from key_health import FAILURE_AUTH, FAILURE_TRANSIENT, KeyHealth, classify_errors, get_shared_key_health
+from part_number import canonicalize
+from metrics import LOOKUP_ERROR, LOOKUP_EXACT, LOOKUP_NOT_FOUND, LOOKUP_SIMILAR, shared_metrics
+from pricing import PriceTable
+from result_record import PartResult
+from http_session import RetryPolicy, create_session, mount_pool
+from response_cache import NOT_FOUND, ResponseCache
+from fuzzy_index import PartIndex
+from hot_set import HotSet
+from lean_json import decode_search_response
+from singleflight import shared_flight
+from speculation import shared_miss_predictor
 from typing import Dict, List, Optional, Tuple
 
+class MouserAPIError(Exception):
+    """请求Mouser失败（网络错误、重试用尽或接口返回错误），与"未找到"区分"""
+
+
 class MouserAPI:
-    def __init__(self, api_keys=None):
+    def __init__(self, api_keys=None, cache: Optional[ResponseCache] = None, search_url: Optional[str] = None,
+                 key_health: Optional[KeyHealth] = None, part_index: Optional[PartIndex] = None,
+                 scheduler: Optional[RequestScheduler] = None, priority: int = PRIORITY_BATCH, session_id: str = "",
+                 hot_set: Optional[HotSet] = None):
         self.api_keys = api_keys if api_keys is not None else config.MOUSER_API_KEYS
-        self.current_key_index = 0
+        # 搜索接口地址，可指向本地模拟服务器进行测试
+        self.search_url = search_url if search_url is not None else config.MOUSER_SEARCH_URL
+        # 可选的本地响应缓存
+        self.cache = cache
+        # 可选的已知型号索引，用于在本地解决相似型号搜索
+        self.part_index = part_index
+        # 可选的常用型号集合，记录查询频率供后台刷新使用
+        self.hot_set = hot_set
+        # 进程内共享，合并所有实例中相同的并发查询
+        self.flight = shared_flight
+        # 复用连接的HTTP会话和重试策略
+        self.pool_size = config.MAX_CONCURRENCY + config.SPECULATIVE_WORKERS
+        self.session = create_session(self.pool_size)
+        self.retry_policy = RetryPolicy()
         self.request_count = 0
-        self.last_request_time = 0
+        # 进程内共享的运行指标
+        self.metrics = shared_metrics
+        # 密钥配额统计和熔断状态，默认进程内共享
+        self.key_health = key_health if key_health is not None else get_shared_key_health()
+        # 进程内共享的请求调度器，按优先级和会话分配令牌
+        self.scheduler = scheduler if scheduler is not None else get_shared_scheduler()
+        self.priority = priority
+        self.session_id = session_id
+        # 每个密钥独立的令牌桶限速，跳过熔断中的密钥；使用相同密钥的实例共享
+        self.rate_limiter = self.scheduler.rate_limiter(self.api_keys, self.key_health)
+        # 每个密钥独立的自适应并发上限，使用相同密钥的实例共享
+        self.concurrency = self.scheduler.concurrency
+        # 根据历史结果对可能找不到的型号提前并行搜索相似型号
+        self.miss_predictor = shared_miss_predictor
+        self._speculation_pool = ThreadPoolExecutor(max_workers=config.SPECULATIVE_WORKERS,
+                                                    thread_name_prefix="speculative-search")
         
+    def reserve_connections(self, concurrency: int):
+        """
+        按实际并发数扩大连接池，并发查询引擎创建时调用
+
+        Args:
+            concurrency: 同时执行查询的线程数，另加提前搜索相似型号的线程数
+        """
+        pool_size = concurrency + config.SPECULATIVE_WORKERS
+        if pool_size > self.pool_size:
+            self.pool_size = pool_size
+            mount_pool(self.session, pool_size)
+    
     def _get_next_api_key(self) -> str:
-        """轮换到下一个API密钥"""
-        api_key = self.api_keys[self.current_key_index]
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+        """获取一个当前有令牌可用的API密钥，所有密钥都用尽时按优先级排队等待"""
+        api_key = self.scheduler.acquire(self.rate_limiter, self.priority, self.session_id)
+        self.metrics.set_key_tokens(api_key, self.rate_limiter.tokens_today(api_key))
         return api_key
     
-    def _rate_limit_check(self):
-        """检查速率限制"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        # 确保请求间隔
-        if time_since_last_request < config.REQUEST_DELAY:
-            time.sleep(config.REQUEST_DELAY - time_since_last_request)
-            
-        self.last_request_time = time.time()
-    
     def search_part(self, part_number: str) -> Optional[Dict]:
         """
         搜索指定型号的电子元器件
@@ -37,97 +87,376 @@ class MouserAPI:
         Returns:
             包含产品信息的字典，如果未找到则返回None
         """
-        self._rate_limit_check()
+        return self._search(part_number, "None")
+    
+    def search_similar_part(self, part_number: str) -> Optional[Dict]:
+        """
+        搜索相似型号的电子元器件
+        
+        Args:
+            part_number: 电子元器件型号
+            
+        Returns:
+            包含相似产品信息的字典，如果未找到则返回None
+        """
+        # 本地索引中有足够相似的已知型号时直接使用，不发送模糊搜索请求
+        if self.part_index is not None:
+            local_part = self._match_locally(part_number)
+            if local_part is not None:
+                return local_part
+        return self._search(part_number, "PartialMatch")
+    
+    def _match_locally(self, part_number: str) -> Optional[Dict]:
+        """
+        在已知型号索引中查找相似型号
         
-        # 获取当前API密钥
-        api_key = self._get_next_api_key()
+        Args:
+            part_number: 电子元器件型号
+            
+        Returns:
+            相似产品的信息，本地置信度不足时返回None
+        """
+        match = self.part_index.match(part_number)
+        if match is None:
+            return None
+        entry = self.part_index.get(match[0])
+        if entry is None:
+            return None
+        part_data, fetched_at = entry
+        if time.time() - fetched_at <= config.CACHE_PRICE_TTL:
+            return part_data
+        # 价格和库存已过期时按找到的型号精确搜索（可能命中缓存），仍然省去一次模糊搜索
+        return self.search_part(part_data.get("ManufacturerPartNumber") or match[0])
+    
+    def _search(self, part_number: str, search_option: str) -> Optional[Dict]:
+        """
+        按指定搜索选项查询元件，优先使用缓存
         
-        # 构建请求URL
-        url = f"{config.MOUSER_SEARCH_URL}?apiKey={api_key}"
+        Args:
+            part_number: 电子元器件型号
+            search_option: 搜索选项，"None" 为精确搜索，"PartialMatch" 为模糊搜索
+            
+        Returns:
+            包含产品信息的字典，如果未找到则返回None
+        """
+        part_number = canonicalize(part_number)
+        # 缓存命中时直接返回，不占用速率限制
+        if self.cache is not None:
+            cached_part = self.cache.get(part_number, search_option)
+            self.metrics.record_cache(cached_part is not None)
+            if cached_part is NOT_FOUND:
+                return None
+            if cached_part is not None:
+                return cached_part
+        
+        # 相同查询正在进行时等待其结果，不重复请求
+        return self.flight.do((part_number, search_option), lambda: self._fetch(part_number, search_option))
+    
+    def _fetch(self, part_number: str, search_option: str) -> Optional[Dict]:
+        """
+        向Mouser发送搜索请求，并将找到的产品写入缓存，请求失败时抛出 MouserAPIError
         
+        Args:
+            part_number: 电子元器件型号
+            search_option: 搜索选项
+            
+        Returns:
+            包含产品信息的字典，如果未找到则返回None
+        """
         # 构建请求数据
         payload = {
             "SearchByPartRequest": {
                 "mouserPartNumber": part_number,
-                "partSearchOptions": "None"
+                "partSearchOptions": search_option
             }
         }
         
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+        search_label = "搜索相似型号" if search_option == "PartialMatch" else "搜索"
+        data = self._post_search(payload, f"{search_label} {part_number}")
         
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # 检查是否找到了产品
-                if "SearchResults" in data and data["SearchResults"]["NumberOfResult"] > 0:
-                    return data["SearchResults"]["Parts"][0]  # 返回第一个匹配的产品
-                
-            elif response.status_code == 429:
-                # 如果遇到速率限制，等待一段时间后重试
-                time.sleep(5)
-                return self.search_part(part_number)
-                
-        except Exception as e:
-            print(f"搜索 {part_number} 时发生错误: {str(e)}")
-            
+        parts = []
+        if data and data.get("SearchResults"):
+            parts = data["SearchResults"].get("Parts") or []
+        if search_option == "None":
+            # 精确搜索与批量搜索使用同一规则判断是否找到，两者写入同一缓存键
+            part_data = self._match_parts([part_number], parts).get(part_number)
+        else:
+            part_data = parts[0] if parts else None  # 相似型号搜索返回第一个产品
+        
+        # 检查是否找到了产品
+        if part_data is not None:
+            if search_option == "None":
+                self.miss_predictor.record(part_number, True)
+            if self.cache is not None:
+                self.cache.set(part_number, search_option, part_data)
+            if self.part_index is not None:
+                self.part_index.add(part_data)
+            return part_data
+        
+        # 请求失败时 _post_search 已抛出异常，走到这里说明Mouser明确没有结果
+        if search_option == "None":
+            self.miss_predictor.record(part_number, False)
+        if self.cache is not None:
+            self.cache.set_not_found(part_number, search_option)
         return None
     
-    def search_similar_part(self, part_number: str) -> Optional[Dict]:
+    def search_parts(self, part_numbers: List[str]) -> Dict[str, Optional[Dict]]:
         """
-        搜索相似型号的电子元器件
+        批量精确搜索多个型号，每个请求最多包含 MOUSER_BATCH_SIZE 个型号
         
         Args:
-            part_number: 电子元器件型号
+            part_numbers: 电子元器件型号列表
             
         Returns:
-            包含相似产品信息的字典，如果未找到则返回None
+            {型号: 产品信息字典} 映射，键为输入的原始型号，未找到的型号对应None
         """
-        self._rate_limit_check()
+        # 按规范形式去重、查缓存和请求，写法不同的同一型号只查询一次
+        canonical = {part_number: canonicalize(part_number) for part_number in part_numbers}
+        results: Dict[str, Optional[Dict]] = {}
+        missing = []
+        for part_number in canonical.values():
+            if not part_number or part_number in results or part_number in missing:
+                continue
+            cached_part = None
+            if self.cache is not None:
+                cached_part = self.cache.get(part_number, "None")
+                self.metrics.record_cache(cached_part is not None)
+            if cached_part is NOT_FOUND:
+                results[part_number] = None
+            elif cached_part is not None:
+                results[part_number] = cached_part
+            else:
+                missing.append(part_number)
         
-        # 获取当前API密钥
-        api_key = self._get_next_api_key()
+        # 与其他会话或单个查询进行中的相同型号合并，只请求没有在进行中的型号
+        fetched = self.flight.do_many(
+            [(part_number, "None") for part_number in missing],
+            lambda keys: {(part_number, "None"): part_data
+                          for part_number, part_data in self._fetch_parts([key[0] for key in keys]).items()},
+        )
+        results.update({part_number: part_data for (part_number, _), part_data in fetched.items()})
+        return {original: results.get(part_number) for original, part_number in canonical.items()}
+    
+    def refresh_parts(self, part_numbers: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        不读取缓存，重新获取多个型号的最新数据并写入缓存，用于后台刷新
         
-        # 构建请求URL
-        url = f"{config.MOUSER_SEARCH_URL}?apiKey={api_key}"
+        Args:
+            part_numbers: 电子元器件型号列表
+            
+        Returns:
+            {规范形式的型号: 产品信息字典} 映射，未找到的型号对应None
+        """
+        unique = []
+        for part_number in part_numbers:
+            part_number = canonicalize(part_number)
+            if part_number and part_number not in unique:
+                unique.append(part_number)
+        return self._fetch_parts(unique)
+    
+    def _fetch_parts(self, part_numbers: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        按 MOUSER_BATCH_SIZE 分批请求规范形式的型号，并将结果写入缓存和型号索引
         
-        # 构建请求数据，使用模糊搜索
-        payload = {
-            "SearchByPartRequest": {
-                "mouserPartNumber": part_number,
-                "partSearchOptions": "PartialMatch"
+        Args:
+            part_numbers: 不重复的规范形式型号列表
+            
+        Returns:
+            {型号: 产品信息字典} 映射，未找到的型号对应None
+        """
+        results: Dict[str, Optional[Dict]] = {}
+        batch_size = max(1, config.MOUSER_BATCH_SIZE)
+        for start in range(0, len(part_numbers), batch_size):
+            batch = part_numbers[start:start + batch_size]
+            
+            # 多个型号用 | 分隔放在同一个请求中
+            payload = {
+                "SearchByPartRequest": {
+                    "mouserPartNumber": "|".join(batch),
+                    "partSearchOptions": "None"
+                }
             }
-        }
+            data = self._post_search(payload, f"批量搜索 {batch[0]} 等 {len(batch)} 个型号")
+            parts = []
+            if data and data.get("SearchResults"):
+                parts = data["SearchResults"].get("Parts") or []
+            
+            matched = self._match_parts(batch, parts)
+            for part_number in batch:
+                part_data = matched.get(part_number)
+                if part_data is not None:
+                    self.miss_predictor.record(part_number, True)
+                    if self.cache is not None:
+                        self.cache.set(part_number, "None", part_data)
+                    if self.part_index is not None:
+                        self.part_index.add(part_data)
+                else:
+                    self.miss_predictor.record(part_number, False)
+                    if self.cache is not None:
+                        self.cache.set_not_found(part_number, "None")
+                results[part_number] = part_data
         
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+        return results
+    
+    @staticmethod
+    def _match_parts(part_numbers: List[str], parts: List[Dict]) -> Dict[str, Dict]:
+        """
+        将精确搜索返回的产品对应回请求的型号（返回顺序和数量都可能与请求不同）
+        
+        单个和批量精确搜索都使用这一规则：优先选择料号与型号完全相同的产品，
+        否则选择料号以该型号开头的最短料号（Mouser精确搜索也会返回带包装后缀的型号，如 LM358DR → LM358DRG4）。
+        
+        Args:
+            part_numbers: 请求的型号列表
+            parts: 响应中的产品列表
+            
+        Returns:
+            {型号: 产品信息字典} 映射，只包含匹配上的型号
+        """
+        # 按贸泽料号、制造商型号以及去掉贸泽前缀后的料号建立索引，保留第一个出现的产品
+        index: Dict[str, Dict] = {}
+        for part_data in parts:
+            if not isinstance(part_data, dict):
+                continue
+            mouser_number = canonicalize(part_data.get("MouserPartNumber") or "")
+            candidates = [
+                mouser_number,
+                canonicalize(part_data.get("ManufacturerPartNumber") or ""),
+                mouser_number.split("-", 1)[1] if "-" in mouser_number else ""
+            ]
+            for candidate in candidates:
+                if candidate and candidate not in index:
+                    index[candidate] = part_data
         
+        matched = {}
+        for part_number in part_numbers:
+            query = canonicalize(part_number)
+            if not query:
+                continue
+            part_data = index.get(query)
+            if part_data is None:
+                # 没有完全相同的料号时，取以该型号开头的最短料号
+                prefixed = [candidate for candidate in index if candidate.startswith(query)]
+                if prefixed:
+                    part_data = index[min(prefixed, key=lambda candidate: (len(candidate), candidate))]
+            if part_data is not None:
+                matched[part_number] = part_data
+        return matched
+    
+    def _send(self, api_key: str, payload: Dict) -> requests.Response:
+        """
+        用指定密钥发送一次请求，记录指标并按结果调整该密钥的并发上限
+        
+        Args:
+            api_key: API密钥
+            payload: 请求数据
+            
+        Returns:
+            HTTP响应，网络异常时直接抛出
+        """
+        url = f"{self.search_url}?apiKey={api_key}"
+        # 并发名额已在 _get_next_api_key 中随令牌一起占用
+        # 持久化记录每次请求，按滚动24小时统计配额
+        self.key_health.record_call(api_key)
+        start_time = time.monotonic()
+        status = "error"
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = self.session.post(url, json=payload, timeout=config.REQUEST_TIMEOUT)
+            status = str(response.status_code)
+            return response
+        except requests.Timeout:
+            status = "timeout"
+            raise
+        finally:
+            elapsed = time.monotonic() - start_time
+            self.metrics.record_request(api_key, status, elapsed)
+            # 限流、服务端错误、超时和连接失败视为拥塞，降低该密钥的并发上限
+            congested = status in ("429", "timeout", "error") or status.startswith("5")
+            self.scheduler.release(api_key, elapsed, congested)
+            self.metrics.set_key_concurrency(api_key, self.concurrency.limit(api_key))
+    
+    def _post_search(self, payload: Dict, description: str) -> Dict:
+        """
+        发送搜索请求，按重试策略处理限流、超时和服务端错误
+        
+        配额用尽或无效的密钥会被熔断并立即换用其他密钥重试。
+        请求最终失败时抛出 MouserAPIError，而不是返回空结果，避免被当成"未找到"。
+        
+        Args:
+            payload: 请求数据
+            description: 用于错误信息的请求描述
+            
+        Returns:
+            响应的JSON数据，产品只保留用到的字段
+        """
+        max_attempts = self.retry_policy.max_attempts
+        reason = ""
+        for attempt in range(max_attempts):
+            if attempt > 0:
+                self.metrics.record_retry()
             
-            if response.status_code == 200:
-                data = response.json()
+            # 每次尝试都重新获取有令牌可用的API密钥
+            api_key = self._get_next_api_key()
+            retry_after = None
+            
+            try:
+                response = self._send(api_key, payload)
+            except requests.Timeout:
+                reason = "请求超时"
+                self.key_health.record_failure(api_key, FAILURE_TRANSIENT, reason)
+            except requests.ConnectionError as e:
+                reason = f"连接失败: {str(e)}"
+                self.key_health.record_failure(api_key, FAILURE_TRANSIENT, reason)
+            except Exception as e:
+                self.key_health.record_neutral(api_key)
+                raise MouserAPIError(f"{description} 时发生错误: {str(e)}")
+            else:
+                if response.status_code in (401, 403):
+                    # 密钥无效或被停用，熔断后换用其他密钥
+                    reason = f"HTTP {response.status_code}"
+                    self.key_health.record_failure(api_key, FAILURE_AUTH, reason)
+                    continue
                 
-                # 检查是否找到了产品
-                if "SearchResults" in data and data["SearchResults"]["NumberOfResult"] > 0:
-                    return data["SearchResults"]["Parts"][0]  # 返回第一个匹配的产品
+                if response.status_code == 200:
+                    try:
+                        # 直接解析响应字节，丢弃用不到的产品字段，降低高并发时的CPU和内存占用
+                        data = decode_search_response(response.content)
+                    except ValueError as e:
+                        self.key_health.record_neutral(api_key)
+                        raise MouserAPIError(f"{description} 时响应解析失败: {str(e)}")
+                    
+                    errors = data.get("Errors")
+                    if errors:
+                        reason = "; ".join(str(error.get("Message", error)) if isinstance(error, dict) else str(error)
+                                           for error in errors)
+                        failure = classify_errors(errors)
+                        if failure is not None:
+                            # 配额用尽或密钥无效，熔断后换用其他密钥
+                            self.key_health.record_failure(api_key, failure, reason)
+                            continue
+                        self.key_health.record_neutral(api_key)
+                        raise MouserAPIError(f"{description} 时Mouser返回错误: {reason}")
+                    
+                    self.key_health.record_success(api_key)
+                    return data
                 
-            elif response.status_code == 429:
-                # 如果遇到速率限制，等待一段时间后重试
-                time.sleep(5)
-                return self.search_similar_part(part_number)
+                if not self.retry_policy.should_retry(response.status_code):
+                    self.key_health.record_neutral(api_key)
+                    raise MouserAPIError(f"{description} 时请求失败: HTTP {response.status_code}")
                 
-        except Exception as e:
-            print(f"搜索相似型号 {part_number} 时发生错误: {str(e)}")
+                # 限流或服务端错误，优先遵循 Retry-After
+                reason = f"HTTP {response.status_code}"
+                retry_after = RetryPolicy.parse_retry_after(response.headers.get("Retry-After"))
+                if self.retry_policy.waits_too_long(retry_after):
+                    # 要求的等待超过退避上限时不缩短等待，断开该密钥到期满为止，立即换用其他密钥
+                    self.key_health.record_failure(api_key, FAILURE_TRANSIENT, reason, open_seconds=retry_after)
+                    continue
+                self.key_health.record_failure(api_key, FAILURE_TRANSIENT, reason)
             
-        return None
+            if attempt + 1 < max_attempts:
+                time.sleep(self.retry_policy.backoff(attempt, retry_after))
+        
+        raise MouserAPIError(f"{description} 时发生错误: {reason}，已尝试 {max_attempts} 次")
     
     def extract_pricing_info(self, part_data: Dict) -> Tuple[float, int]:
         """
@@ -139,40 +468,7 @@ class MouserAPI:
         Returns:
             (价格, 批次数量) 元组
         """
-        # 检查是否有价格信息
-        if "PriceBreaks" not in part_data or not part_data["PriceBreaks"]:
-            # 如果没有价格阶梯信息，尝试从其他字段获取
-            if "Price" in part_data and part_data["Price"]:
-                try:
-                    # 尝试解析单价字段
-                    price_str = part_data["Price"].replace("$", "").replace("¥", "").strip()
-                    price = float(price_str)
-                    # 尝试获取最小购买数量
-                    min_qty = int(part_data.get("Min", "1")) if part_data.get("Min") else 1
-                    return (price, min_qty)
-                except (ValueError, TypeError):
-                    pass
-            return (0.0, 0)
-        
-        # 找到最大批次的数量和对应的价格
-        max_quantity = 0
-        price_for_max_quantity = 0.0
-        
-        for price_break in part_data["PriceBreaks"]:
-            try:
-                quantity = int(price_break["Quantity"])
-                # 处理价格字符串，移除货币符号
-                price_str = price_break["Price"].replace("$", "").replace("¥", "").replace("€", "").replace("£", "").strip()
-                price = float(price_str)
-                
-                if quantity > max_quantity:
-                    max_quantity = quantity
-                    price_for_max_quantity = price
-            except (ValueError, KeyError, TypeError):
-                # 如果解析失败，跳过这个价格阶梯
-                continue
-                
-        return (price_for_max_quantity, max_quantity)
+        return PriceTable.from_parts([part_data]).max_tier(0)
     
     def is_discontinued(self, part_data: Dict) -> bool:
         """
@@ -197,4 +493,179 @@ class MouserAPI:
         Returns:
             推荐的替代型号，如果没有则返回空字符串
         """
-        return part_data.get("SuggestedReplacement", "")
\ No newline at end of file
+        return part_data.get("SuggestedReplacement", "")
+    
+    def build_result(self, component: str, part_data: Dict, similar: bool = False) -> PartResult:
+        """
+        根据产品数据生成一行查询结果
+        
+        Args:
+            component: 用户输入的元件型号
+            part_data: 产品数据字典
+            similar: 产品数据是否来自相似型号搜索
+            
+        Returns:
+            查询结果
+        """
+        # 提取价格信息，保留全部价格阶梯供后续按数量计价
+        price_table = PriceTable.from_parts([part_data])
+        price, quantity = price_table.max_tier(0)
+        
+        # 检查是否停产
+        is_discontinued = self.is_discontinued(part_data)
+        
+        # 获取替代型号
+        replacement_part = self.get_replacement_part(part_data)
+        
+        # 设置备注信息
+        if is_discontinued and price == 0:
+            remark = "已停产无价格"
+        elif is_discontinued:
+            remark = "已停产"
+        elif price == 0:
+            remark = "无价格信息"
+        else:
+            remark = "相似型号爬取" if similar else ""
+        
+        return PartResult(
+            component=component,
+            searched_part=part_data.get("ManufacturerPartNumber", "") if similar else component,
+            product_name=part_data.get("ManufacturerPartNumber", ""),
+            manufacturer=part_data.get("Manufacturer", ""),
+            price=price,
+            quantity=quantity,
+            availability=part_data.get("Availability", ""),
+            discontinued=is_discontinued,
+            replacement=replacement_part,
+            remark=remark,
+            price_breaks=price_table.tiers(0),
+            currency=price_table.currency(0)
+        )
+    
+    @staticmethod
+    def empty_result(component: str, remark: str) -> PartResult:
+        """
+        生成未查到产品时的结果行
+        
+        Args:
+            component: 用户输入的元件型号
+            remark: 备注信息
+            
+        Returns:
+            查询结果
+        """
+        return PartResult(component, remark=remark)
+    
+    def _start_speculation(self, components: List[str]) -> Dict[str, Future]:
+        """
+        对历史上经常找不到的型号提前发起相似型号搜索，与精确搜索并行进行
+        
+        Args:
+            components: 电子元器件型号列表
+            
+        Returns:
+            {型号: 相似型号搜索的Future} 映射，只包含提前发起搜索的型号
+        """
+        futures: Dict[str, Future] = {}
+        if not config.SPECULATIVE_LOOKUP:
+            return futures
+        for component in components:
+            if not component or component in futures or not self.miss_predictor.likely_miss(component):
+                continue
+            # 精确搜索结果已在缓存中时不需要提前搜索
+            if self.cache is not None and self.cache.get(component, "None") is not None:
+                continue
+            futures[component] = self._speculation_pool.submit(self.search_similar_part, component)
+        return futures
+    
+    def lookup_components(self, components: List[str]) -> List[PartResult]:
+        """
+        批量查询多个元件，精确搜索合并为批量请求，未找到的元件再逐个尝试相似型号
+        
+        Args:
+            components: 电子元器件型号列表
+            
+        Returns:
+            与输入顺序一致的查询结果列表
+        """
+        if len(components) == 1:
+            return [self.lookup_component(components[0])]
+        
+        # 查询使用规范形式，结果中保留用户输入的写法
+        queries = [canonicalize(component) for component in components]
+        if self.hot_set is not None:
+            self.hot_set.record(queries)
+        speculative = self._start_speculation(queries)
+        try:
+            found = self.search_parts(queries)
+        except Exception as e:
+            self.metrics.record_lookup(LOOKUP_ERROR, len(components))
+            return [self.empty_result(component, f"错误: {str(e)}") for component in components]
+        
+        results = []
+        for component, query in zip(components, queries):
+            part_data = found.get(query)
+            if part_data:
+                self.metrics.record_lookup(LOOKUP_EXACT)
+                results.append(self.build_result(component, part_data))
+                continue
+            if not query:
+                self.metrics.record_lookup(LOOKUP_NOT_FOUND)
+                results.append(self.empty_result(component, "未找到"))
+                continue
+            try:
+                # 尝试搜索相似型号，已提前发起时直接等待其结果
+                similar_future = speculative.get(query)
+                if similar_future is not None:
+                    similar_part_data = similar_future.result()
+                else:
+                    similar_part_data = self.search_similar_part(query)
+                if similar_part_data:
+                    self.metrics.record_lookup(LOOKUP_SIMILAR)
+                    results.append(self.build_result(component, similar_part_data, similar=True))
+                else:
+                    self.metrics.record_lookup(LOOKUP_NOT_FOUND)
+                    results.append(self.empty_result(component, "未找到"))
+            except Exception as e:
+                self.metrics.record_lookup(LOOKUP_ERROR)
+                results.append(self.empty_result(component, f"错误: {str(e)}"))
+        return results
+    
+    def lookup_component(self, component: str) -> PartResult:
+        """
+        查询单个元件，精确搜索未找到时尝试相似型号搜索
+        
+        Args:
+            component: 电子元器件型号
+            
+        Returns:
+            查询结果，出错时备注中包含错误信息
+        """
+        # 查询使用规范形式，结果中保留用户输入的写法
+        query = canonicalize(component)
+        if not query:
+            self.metrics.record_lookup(LOOKUP_NOT_FOUND)
+            return self.empty_result(component, "未找到")
+        if self.hot_set is not None:
+            self.hot_set.record([query])
+        try:
+            similar_future = self._start_speculation([query]).get(query)
+            part_data = self.search_part(query)
+            if part_data:
+                self.metrics.record_lookup(LOOKUP_EXACT)
+                return self.build_result(component, part_data)
+            
+            # 尝试搜索相似型号，已提前发起时直接等待其结果
+            if similar_future is not None:
+                similar_part_data = similar_future.result()
+            else:
+                similar_part_data = self.search_similar_part(query)
+            if similar_part_data:
+                self.metrics.record_lookup(LOOKUP_SIMILAR)
+                return self.build_result(component, similar_part_data, similar=True)
+            
+            self.metrics.record_lookup(LOOKUP_NOT_FOUND)
+            return self.empty_result(component, "未找到")
+        except Exception as e:
+            self.metrics.record_lookup(LOOKUP_ERROR)
+            return self.empty_result(component, f"错误: {str(e)}")
\ No newline at end of file
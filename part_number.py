@@ -0,0 +1,32 @@
+import re
+import unicodedata
+
+# 零宽字符和BOM，NFKC不会去掉它们
+_INVISIBLE_CHARS = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff"))
+# Excel把纯数字型号存成浮点数后读出的形式，如 2222.0
+_FLOAT_ARTEFACT = re.compile(r"^(\d+)\.0+$")
+
+
+def canonicalize(part_number) -> str:
+    """
+    将型号转换为查询、缓存和去重使用的规范形式
+
+    - NFKC 规范化，把中文输入法产生的全角字母、数字和符号转换为半角
+    - 去掉零宽字符和所有空白
+    - 转为大写
+    - 去掉Excel数字单元格产生的 ".0" 后缀
+
+    Args:
+        part_number: 原始型号，可以是Excel单元格中的数字
+
+    Returns:
+        规范化后的型号，没有有效字符时返回空字符串
+    """
+    if isinstance(part_number, float) and part_number.is_integer():
+        part_number = int(part_number)
+    text = unicodedata.normalize("NFKC", str(part_number)).translate(_INVISIBLE_CHARS)
+    text = "".join(text.split()).upper()
+    match = _FLOAT_ARTEFACT.match(text)
+    if match:
+        text = match.group(1)
+    return text
@@ -0,0 +1,201 @@
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 价格字符串中的数字部分，如 "¥1,234.50"、"$0.123"、"0,123 €"
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+# 价格字符串中的货币符号
+_CURRENCY_SYMBOLS = {"¥": "CNY", "$": "USD", "€": "EUR", "£": "GBP"}
+_CURRENCY_RE = re.compile("[" + re.escape("".join(_CURRENCY_SYMBOLS)) + "]")
+
+
+def parse_price(text) -> Optional[float]:
+    """
+    解析价格字符串
+
+    Args:
+        text: 价格字符串或数字
+
+    Returns:
+        价格数值，无法解析时返回None
+    """
+    if isinstance(text, (int, float)):
+        return float(text)
+    if not text:
+        return None
+
+    match = _NUMBER_RE.search(str(text))
+    if match is None:
+        return None
+    number = match.group()
+
+    if "," in number and "." in number:
+        # 两种分隔符都有时，最后出现的是小数点
+        if number.rfind(",") > number.rfind("."):
+            number = number.replace(".", "").replace(",", ".")
+        else:
+            number = number.replace(",", "")
+    elif "," in number:
+        # 只有逗号时，"0,123" 或最后一组不是3位数字视为小数点，否则视为千分位
+        groups = number.split(",")
+        if number.startswith("0,") or len(groups) == 2 and len(groups[1]) != 3:
+            number = number.replace(",", ".")
+        else:
+            number = number.replace(",", "")
+
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def parse_currency(price_break: Dict) -> str:
+    """从价格阶梯中取得货币代码，没有 Currency 字段时根据货币符号判断"""
+    currency = price_break.get("Currency")
+    if currency:
+        return str(currency)
+    match = _CURRENCY_RE.search(str(price_break.get("Price", "")))
+    return _CURRENCY_SYMBOLS[match.group()] if match else ""
+
+
+def _parse_quantity(value) -> Optional[int]:
+    """解析数量字段"""
+    try:
+        return int(float(str(value).replace(",", "")))
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceTable:
+    """
+    多个产品的完整价格阶梯，按列存储
+
+    所有产品的阶梯依次存放在 quantities / prices / currencies 数组中，
+    第 i 个产品的阶梯位于 offsets[i]:offsets[i + 1]，且按数量从小到大排列。
+    """
+
+    def __init__(self):
+        self.offsets = array("l", [0])
+        self.part_index = array("l")
+        self.quantities = array("l")
+        self.prices = array("d")
+        self.currencies = array("h")
+        self.currency_codes: List[str] = []
+        self._currency_lookup: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _currency_id(self, code: str) -> int:
+        currency_id = self._currency_lookup.get(code)
+        if currency_id is None:
+            currency_id = len(self.currency_codes)
+            self.currency_codes.append(code)
+            self._currency_lookup[code] = currency_id
+        return currency_id
+
+    def _append_part(self, tiers: List[Tuple[int, float, str]]):
+        """追加一个产品的阶梯（数量, 单价, 货币）"""
+        part = len(self)
+        tiers.sort(key=lambda tier: tier[0])
+        for quantity, price, currency in tiers:
+            self.part_index.append(part)
+            self.quantities.append(quantity)
+            self.prices.append(price)
+            self.currencies.append(self._currency_id(currency))
+        self.offsets.append(len(self.quantities))
+
+    @classmethod
+    def from_parts(cls, parts: Iterable[Optional[Dict]]) -> "PriceTable":
+        """
+        解析多个产品数据中的全部价格阶梯
+
+        Args:
+            parts: Mouser产品数据字典序列，None表示没有产品数据
+
+        Returns:
+            价格表，第 i 个产品对应输入中的第 i 项
+        """
+        table = cls()
+        for part_data in parts:
+            tiers = []
+            if part_data:
+                for price_break in part_data.get("PriceBreaks") or []:
+                    try:
+                        quantity = _parse_quantity(price_break["Quantity"])
+                        price = parse_price(price_break["Price"])
+                    except (KeyError, TypeError, AttributeError):
+                        # 如果解析失败，跳过这个价格阶梯
+                        continue
+                    if quantity is not None and price is not None:
+                        tiers.append((quantity, price, parse_currency(price_break)))
+
+                # 如果没有价格阶梯信息，尝试从单价字段获取
+                if not tiers and part_data.get("Price"):
+                    price = parse_price(part_data["Price"])
+                    if price is not None:
+                        min_qty = _parse_quantity(part_data.get("Min")) if part_data.get("Min") else 1
+                        tiers.append((min_qty or 1, price, parse_currency(part_data)))
+            table._append_part(tiers)
+        return table
+
+    @classmethod
+    def from_tiers(cls, tier_lists: Iterable[Sequence[Sequence]],
+                   currencies: Optional[Iterable[str]] = None) -> "PriceTable":
+        """
+        从已保存的阶梯列表构建价格表
+
+        Args:
+            tier_lists: 每个产品的 [(数量, 单价), ...] 列表
+            currencies: 每个产品的货币代码，与 tier_lists 一一对应，默认均为未知
+
+        Returns:
+            价格表
+        """
+        table = cls()
+        currencies = iter(currencies) if currencies is not None else None
+        for tiers in tier_lists:
+            currency = next(currencies, "") if currencies is not None else ""
+            table._append_part([(int(tier[0]), float(tier[1]), currency) for tier in tiers or []])
+        return table
+
+    def tiers(self, part: int) -> List[Tuple[int, float]]:
+        """返回第 part 个产品的全部阶梯 [(数量, 单价), ...]"""
+        start, end = self.offsets[part], self.offsets[part + 1]
+        return list(zip(self.quantities[start:end], self.prices[start:end]))
+
+    def max_tier(self, part: int) -> Tuple[float, int]:
+        """
+        返回第 part 个产品最大批次的价格
+
+        Returns:
+            (价格, 批次数量) 元组，没有价格信息时返回 (0.0, 0)
+        """
+        start, end = self.offsets[part], self.offsets[part + 1]
+        if start == end:
+            return (0.0, 0)
+        return (self.prices[end - 1], self.quantities[end - 1])
+
+    def price_at(self, part: int, quantity: int) -> float:
+        """
+        返回第 part 个产品在购买数量为 quantity 时的单价
+
+        购买数量低于最小阶梯时按最小阶梯计价，没有价格信息时返回0
+        """
+        start, end = self.offsets[part], self.offsets[part + 1]
+        if start == end:
+            return 0.0
+        price = self.prices[start]
+        for position in range(start, end):
+            if self.quantities[position] > quantity:
+                break
+            price = self.prices[position]
+        return price
+
+    def currency(self, part: int) -> str:
+        """返回第 part 个产品的货币代码"""
+        start, end = self.offsets[part], self.offsets[part + 1]
+        if start == end:
+            return ""
+        return self.currency_codes[self.currencies[start]]
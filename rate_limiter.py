@@ -0,0 +1,149 @@
+import threading
+import time
+import config
+from typing import Callable, Dict, List, Optional, Tuple
+
+from key_health import KeyHealth
+
+
+class KeyUnavailableError(RuntimeError):
+    """所有密钥在可接受的时间内都不可用（配额用尽、密钥无效或熔断）"""
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    桶容量为 capacity，令牌以 refill_rate（个/秒）的速度持续补充，
+    每次请求消耗一个令牌。
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._last_refill = clock()
+
+    def _refill(self):
+        """按经过的时间补充令牌"""
+        now = self._clock()
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self._last_refill = now
+
+    def available(self) -> float:
+        """当前可用令牌数"""
+        self._refill()
+        return self.tokens
+
+    def wait_time(self) -> float:
+        """距离下一个令牌可用还需等待的秒数"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        if self.refill_rate <= 0:
+            return float("inf")
+        return (1 - self.tokens) / self.refill_rate
+
+    def consume(self):
+        """消耗一个令牌（调用前需确认令牌可用）"""
+        self._refill()
+        self.tokens -= 1
+
+
+class KeyRateLimiter:
+    """
+    按API密钥分别限速
+
+    每个密钥有一个分钟桶和一个天桶，容量分别取该密钥每分钟、每天的请求上限。
+    获取密钥时选择当前令牌最充足的密钥，因此总吞吐量随密钥数量线性增长。
+    提供 health 时，天桶扣除最近24小时内已用的次数，熔断中的密钥不参与分配。
+    """
+
+    def __init__(self, api_keys: List[str], key_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+                 clock: Callable[[], float] = time.monotonic, health: Optional[KeyHealth] = None):
+        if not api_keys:
+            raise ValueError("至少需要一个API密钥")
+
+        if key_limits is None:
+            key_limits = config.MOUSER_KEY_LIMITS
+
+        self.api_keys = list(api_keys)
+        self.health = health
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        for api_key in self.api_keys:
+            per_minute, per_day = key_limits.get(
+                api_key, (config.MOUSER_REQUESTS_PER_MINUTE, config.MOUSER_REQUESTS_PER_DAY)
+            )
+            day_bucket = TokenBucket(per_day, per_day / 86400.0, clock)
+            if health is not None:
+                # 程序重启后仍按滚动窗口内的实际用量计算剩余配额
+                day_bucket.tokens = max(0.0, per_day - health.used_today(api_key))
+            self._buckets[api_key] = (TokenBucket(per_minute, per_minute / 60.0, clock), day_bucket)
+
+    def try_acquire(self, reserve: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        尝试立即获取一个有令牌的密钥
+
+        Args:
+            reserve: 为候选密钥占用并发名额的函数，返回False时跳过该密钥（如自适应并发已达上限），
+                只有占用成功的密钥才会消耗令牌
+
+        Returns:
+            可用的API密钥，如果所有密钥都没有令牌或并发名额则返回None
+        """
+        with self._lock:
+            candidates = []
+            for api_key in self.api_keys:
+                if self.health is not None and not self.health.breaker(api_key).can_use():
+                    continue
+                minute_bucket, day_bucket = self._buckets[api_key]
+                tokens = min(minute_bucket.available(), day_bucket.available())
+                if tokens >= 1:
+                    candidates.append((tokens, api_key))
+
+            # 令牌最充足的密钥优先，并发已满的密钥让给其他密钥
+            candidates.sort(key=lambda candidate: -candidate[0])
+            for _, api_key in candidates:
+                if reserve is not None and not reserve(api_key):
+                    continue
+                for bucket in self._buckets[api_key]:
+                    bucket.consume()
+                if self.health is not None:
+                    self.health.breaker(api_key).on_dispatch()
+                return api_key
+            return None
+
+    def wait_time(self) -> float:
+        """距离任一密钥有令牌可用还需等待的秒数"""
+        with self._lock:
+            return min(
+                max(minute_bucket.wait_time(), day_bucket.wait_time(),
+                    self.health.breaker(api_key).retry_in() if self.health is not None else 0.0)
+                for api_key, (minute_bucket, day_bucket) in self._buckets.items()
+            )
+
+    def tokens_today(self, api_key: str) -> float:
+        """密钥当天预算中剩余的请求次数"""
+        with self._lock:
+            return self._buckets[api_key][1].available()
+
+    def next_wait(self) -> float:
+        """
+        所有密钥都没有令牌时，计算再次尝试前应等待的秒数
+
+        所有密钥都要等待超过 KEY_MAX_WAIT 秒才能使用时抛出 KeyUnavailableError。
+
+        Returns:
+            本次等待的秒数
+        """
+        wait_time = self.wait_time()
+        if wait_time > config.KEY_MAX_WAIT:
+            raise KeyUnavailableError(
+                f"所有API密钥都不可用（配额用尽、密钥无效或连续失败），约 {wait_time / 60:.0f} 分钟后恢复"
+            )
+        # 分钟桶等待时间很短，天桶耗尽时可能要等很久，分段等待以便及时响应
+        return min(max(wait_time, 0.01), 1.0)
@@ -0,0 +1,103 @@
+import threading
+import time
+import config
+from typing import Optional, Tuple
+
+from hot_set import HotSet
+from mouser_api import MouserAPI, MouserAPIError
+from rate_limiter import KeyUnavailableError
+
+
+def in_window(hours: Tuple[int, int], now: Optional[float] = None) -> bool:
+    """
+    当前本地时间是否在 [开始小时, 结束小时) 内，开始大于结束时表示跨越午夜
+
+    Args:
+        hours: (开始小时, 结束小时)
+        now: 时间戳，默认为当前时间
+    """
+    start, end = hours
+    hour = time.localtime(now).tm_hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class BackgroundRefresher:
+    """
+    在低峰时段重新获取常用型号的价格和库存，使白天的查询直接命中缓存
+
+    每轮从 HotSet 中按 陈旧程度 × 变化频率 × 查询热度 取出最多 max_parts 个型号，
+    分批通过 MouserAPI.refresh_parts 重新获取并写入缓存。
+    MouserAPI 应使用后台优先级。调度器只在进程内共享：在网页进程中启动时（REFRESH_IN_APP），
+    刷新只占用同一进程中使用相同密钥的交互查询和批量查询剩下的配额；
+    main.py refresh 在独立进程中运行，与其他进程的查询平等竞争同一组密钥的配额。
+    """
+
+    def __init__(self, mouser_api: MouserAPI, hot_set: HotSet, max_parts: Optional[int] = None,
+                 off_peak_hours: Optional[Tuple[int, int]] = None):
+        self.mouser_api = mouser_api
+        self.hot_set = hot_set
+        self.max_parts = max_parts if max_parts is not None else config.REFRESH_MAX_PARTS
+        self.off_peak_hours = off_peak_hours if off_peak_hours is not None else config.REFRESH_OFF_PEAK_HOURS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh_once(self, max_parts: Optional[int] = None) -> int:
+        """
+        刷新一轮
+
+        Args:
+            max_parts: 本轮最多刷新的型号数量，默认为 max_parts
+
+        Returns:
+            本轮刷新的型号数量
+        """
+        due = self.hot_set.due(max_parts if max_parts is not None else self.max_parts)
+        refreshed = 0
+        batch_size = max(1, config.MOUSER_BATCH_SIZE)
+        for start in range(0, len(due), batch_size):
+            if self._stop.is_set():
+                break
+            batch = due[start:start + batch_size]
+            try:
+                results = self.mouser_api.refresh_parts(batch)
+            except (MouserAPIError, KeyUnavailableError) as e:
+                # 请求失败或配额用尽时结束本轮，下一轮再试
+                print(f"后台刷新时发生错误: {str(e)}")
+                break
+            for part_number in batch:
+                self.hot_set.record_refresh(part_number, results.get(part_number))
+            refreshed += len(batch)
+        return refreshed
+
+    def run_forever(self, interval: Optional[float] = None, any_time: bool = False):
+        """
+        持续运行，每隔 interval 秒刷新一轮，直到调用 stop
+
+        Args:
+            interval: 两轮之间的间隔(秒)
+            any_time: 为True时不限于低峰时段
+        """
+        interval = interval if interval is not None else config.REFRESH_INTERVAL
+        while not self._stop.is_set():
+            if any_time or in_window(self.off_peak_hours):
+                refreshed = self.refresh_once()
+                if refreshed:
+                    print(f"后台刷新了 {refreshed} 个型号")
+            self._stop.wait(interval)
+
+    def start(self, interval: Optional[float] = None, any_time: bool = False):
+        """在后台线程中运行 run_forever"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, args=(interval, any_time),
+                                        name="cache-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止刷新，当前批次完成后结束"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
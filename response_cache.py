@@ -0,0 +1,151 @@
+import json
+import sqlite3
+import threading
+import time
+import config
+from typing import Dict, Optional
+
+# 价格和库存相关字段，包含这些字段的缓存条目使用较短的有效期
+DYNAMIC_FIELDS = ("PriceBreaks", "Price", "Availability", "AvailabilityInStock", "AvailabilityOnOrder", "FactoryStock")
+
+# 每写入多少条检查一次缓存容量
+EVICTION_CHECK_INTERVAL = 100
+
+# 表示"已确认未找到"的缓存结果，与未命中缓存的None区分
+NOT_FOUND = object()
+
+
+class ResponseCache:
+    """
+    元件搜索结果的本地持久化缓存（SQLite）
+
+    以 (型号, 搜索选项) 为键保存 Mouser 返回的产品数据。
+    带价格/库存信息的条目按 price_ttl 过期，其余条目按 static_ttl 过期，
+    确认未找到的型号按 not_found_ttl 过期，条目数超过 max_entries 时按最近访问时间淘汰。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, price_ttl: Optional[float] = None,
+                 static_ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 not_found_ttl: Optional[float] = None):
+        self.db_path = db_path if db_path is not None else config.CACHE_DB_PATH
+        self.price_ttl = price_ttl if price_ttl is not None else config.CACHE_PRICE_TTL
+        self.static_ttl = static_ttl if static_ttl is not None else config.CACHE_STATIC_TTL
+        self.max_entries = max_entries if max_entries is not None else config.CACHE_MAX_ENTRIES
+        self.not_found_ttl = not_found_ttl if not_found_ttl is not None else config.CACHE_NOT_FOUND_TTL
+
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS part_cache (
+                    part_number TEXT NOT NULL,
+                    search_option TEXT NOT NULL,
+                    part_json TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (part_number, search_option)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_part_cache_accessed ON part_cache (accessed_at)")
+
+    def _ttl_for(self, part_data: Dict) -> float:
+        """根据条目是否包含价格/库存信息选择有效期"""
+        if any(part_data.get(field) for field in DYNAMIC_FIELDS):
+            return self.price_ttl
+        return self.static_ttl
+
+    def get(self, part_number: str, search_option: str):
+        """
+        读取缓存
+
+        Args:
+            part_number: 电子元器件型号
+            search_option: 搜索选项（"None" 或 "PartialMatch"）
+
+        Returns:
+            未过期的产品数据字典；已确认未找到时返回 NOT_FOUND；未命中时返回None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT part_json, expires_at FROM part_cache WHERE part_number = ? AND search_option = ?",
+                (part_number, search_option),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                with self._conn:
+                    self._conn.execute(
+                        "DELETE FROM part_cache WHERE part_number = ? AND search_option = ?",
+                        (part_number, search_option),
+                    )
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE part_cache SET accessed_at = ? WHERE part_number = ? AND search_option = ?",
+                    (now, part_number, search_option),
+                )
+        part_data = json.loads(row[0])
+        return NOT_FOUND if part_data is None else part_data
+
+    def set(self, part_number: str, search_option: str, part_data: Dict):
+        """
+        写入缓存
+
+        Args:
+            part_number: 电子元器件型号
+            search_option: 搜索选项
+            part_data: 产品数据字典
+        """
+        self._write(part_number, search_option, json.dumps(part_data, ensure_ascii=False), self._ttl_for(part_data))
+
+    def set_not_found(self, part_number: str, search_option: str):
+        """
+        记录Mouser确认没有该型号，在 not_found_ttl 内重复查询不再发送请求
+
+        Args:
+            part_number: 电子元器件型号
+            search_option: 搜索选项
+        """
+        if self.not_found_ttl > 0:
+            self._write(part_number, search_option, "null", self.not_found_ttl)
+
+    def _write(self, part_number: str, search_option: str, part_json: str, ttl: float):
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO part_cache VALUES (?, ?, ?, ?, ?)",
+                    (part_number, search_option, part_json, now + ttl, now),
+                )
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= EVICTION_CHECK_INTERVAL:
+                self._writes_since_eviction = 0
+                self._evict(now)
+
+    def _evict(self, now: float):
+        """删除过期条目，并按最近访问时间淘汰超出容量的条目（调用方需持有锁）"""
+        with self._conn:
+            self._conn.execute("DELETE FROM part_cache WHERE expires_at <= ?", (now,))
+            count = self._conn.execute("SELECT COUNT(*) FROM part_cache").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM part_cache WHERE rowid IN "
+                    "(SELECT rowid FROM part_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM part_cache")
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,98 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 结果字段及其显示名称（与界面中显示的顺序完全一致），只在显示和导出时使用
+DISPLAY_FIELDS = [
+    ("component", "元件型号"),
+    ("searched_part", "搜索型号"),
+    ("product_name", "产品名称"),
+    ("manufacturer", "品牌"),
+    ("price", "价格"),
+    ("quantity", "最大批次"),
+    ("availability", "库存"),
+    ("discontinued", "是否停产"),
+    ("replacement", "替代型号"),
+    ("remark", "备注")
+]
+
+
+class PartResult:
+    """
+    单个元件的查询结果
+
+    只保存从Mouser产品数据中提取出的字段，使用 __slots__ 减少大批量查询时的内存占用。
+    """
+
+    __slots__ = (
+        "component", "searched_part", "product_name", "manufacturer", "price", "quantity",
+        "availability", "discontinued", "replacement", "remark", "price_breaks", "currency"
+    )
+
+    def __init__(self, component: str, searched_part: str = "", product_name: str = "",
+                 manufacturer: str = "", price: float = 0, quantity: int = 0, availability: str = "",
+                 discontinued: bool = False, replacement: str = "", remark: str = "",
+                 price_breaks: Optional[Sequence[Tuple[int, float]]] = None, currency: str = ""):
+        self.component = component
+        self.searched_part = searched_part
+        self.product_name = product_name
+        self.manufacturer = manufacturer
+        self.price = price
+        self.quantity = quantity
+        self.availability = availability
+        self.discontinued = discontinued
+        self.replacement = replacement
+        self.remark = remark
+        # 全部价格阶梯 [(数量, 单价), ...]
+        self.price_breaks = [tuple(tier) for tier in price_breaks] if price_breaks else []
+        # 价格阶梯的货币代码，如 "CNY"，未知时为空
+        self.currency = currency
+
+    def __repr__(self) -> str:
+        return f"PartResult({self.component!r}, remark={self.remark!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PartResult):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    @property
+    def failed(self) -> bool:
+        """查询是否出错（而不是未找到）"""
+        return self.remark.startswith("错误")
+
+    def copy(self, component: Optional[str] = None) -> "PartResult":
+        """
+        复制结果，可以替换元件型号
+
+        Args:
+            component: 新的元件型号，默认保持不变
+
+        Returns:
+            新的查询结果
+        """
+        result = PartResult.from_dict(self.to_dict())
+        if component is not None:
+            result.component = component
+        return result
+
+    def display_values(self) -> List:
+        """按 DISPLAY_FIELDS 顺序返回用于显示和导出的值"""
+        values = []
+        for name, _ in DISPLAY_FIELDS:
+            value = getattr(self, name)
+            if name == "discontinued":
+                value = "是" if value else "否"
+            values.append(value)
+        return values
+
+    def to_display_row(self) -> Dict:
+        """转换为以中文列名为键的字典，用于界面表格"""
+        return {label: value for (_, label), value in zip(DISPLAY_FIELDS, self.display_values())}
+
+    def to_dict(self) -> Dict:
+        """转换为可以JSON序列化的字典"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PartResult":
+        """从 to_dict 生成的字典恢复"""
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
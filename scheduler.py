@@ -0,0 +1,159 @@
+import itertools
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from adaptive import AdaptiveConcurrency
+from key_health import KeyHealth
+from rate_limiter import KeyRateLimiter
+
+# 优先级，数值越小越优先
+PRIORITY_INTERACTIVE = 0  # 网页上的单个或少量元件查询
+PRIORITY_BATCH = 1  # 批量查询和文件上传
+PRIORITY_BACKGROUND = 2  # 后台缓存刷新
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BATCH: "batch",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# 记录的会话数超过该值时清理当前没有等待请求的会话
+MAX_TRACKED_SESSIONS = 1000
+
+
+class _Waiter:
+    """一个等待令牌的请求"""
+
+    def __init__(self, limiter: KeyRateLimiter, priority: int, session_id: str, seq: int):
+        self.limiter = limiter
+        self.priority = priority
+        self.session_id = session_id
+        self.seq = seq
+
+
+class RequestScheduler:
+    """
+    进程内共享的请求调度器
+
+    使用相同密钥的所有 MouserAPI 实例共享同一组令牌桶，令牌可用时按以下顺序分配给等待的请求：
+    先比较优先级，交互查询总是排在批量查询之前，批量查询排在后台刷新之前；
+    同一优先级内在不同会话之间轮流分配，最久未分到令牌的会话优先；同一会话内按先后顺序。
+    因此大批量任务只使用交互查询剩下的容量，多个批量任务平分容量。
+    各密钥的自适应并发上限也在这里共享，新建的实例沿用已学到的上限，一个会话遇到限流时其他会话也会降低并发。
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._limiters: Dict[Tuple[Tuple[str, ...], int], KeyRateLimiter] = {}
+        self._waiters: List[_Waiter] = []
+        self._last_served: Dict[Tuple[int, str], int] = {}
+        self._seq = itertools.count()
+        # 按密钥共享的自适应并发上限
+        self.concurrency = AdaptiveConcurrency()
+
+    def rate_limiter(self, api_keys: List[str], health: Optional[KeyHealth] = None) -> KeyRateLimiter:
+        """
+        返回这组密钥共享的限速器，不存在时创建
+
+        Args:
+            api_keys: API密钥列表
+            health: 密钥配额统计和熔断状态，使用不同状态对象的实例不共享限速器
+
+        Returns:
+            同一组密钥在进程内共享的限速器
+        """
+        limiter_key = (tuple(sorted(api_keys)), id(health))
+        with self._condition:
+            limiter = self._limiters.get(limiter_key)
+            if limiter is None:
+                limiter = KeyRateLimiter(list(api_keys), health=health)
+                self._limiters[limiter_key] = limiter
+            return limiter
+
+    def acquire(self, limiter: KeyRateLimiter, priority: int = PRIORITY_BATCH, session_id: str = "") -> str:
+        """
+        按优先级和会话公平排队获取一个有令牌和并发名额的密钥
+
+        返回的密钥已占用一个自适应并发名额，请求结束后必须调用 release。
+
+        所有密钥都要等待超过 KEY_MAX_WAIT 秒才能使用时抛出 KeyUnavailableError。
+
+        Args:
+            limiter: 限速器
+            priority: 请求的优先级
+            session_id: 会话标识，同一优先级内按会话轮流分配
+
+        Returns:
+            可用的API密钥
+        """
+        with self._condition:
+            waiter = _Waiter(limiter, priority, session_id, next(self._seq))
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    if self._next_waiter(limiter) is not waiter:
+                        # 排在前面的请求拿到令牌后会通知
+                        self._condition.wait(1.0)
+                        continue
+                    api_key = limiter.try_acquire(self.concurrency.try_acquire)
+                    if api_key is not None:
+                        self._last_served[(priority, session_id)] = waiter.seq
+                        return api_key
+                    if limiter.wait_time() <= 0:
+                        # 有令牌但所有可用密钥的并发都已满，等待请求结束时的通知
+                        self._condition.wait(1.0)
+                    else:
+                        self._condition.wait(limiter.next_wait())
+            finally:
+                self._waiters.remove(waiter)
+                if len(self._last_served) > MAX_TRACKED_SESSIONS:
+                    active = {(other.priority, other.session_id) for other in self._waiters}
+                    self._last_served = {session: seq for session, seq in self._last_served.items()
+                                         if session in active}
+                self._condition.notify_all()
+
+    def release(self, api_key: str, seconds: float, congested: bool):
+        """
+        释放 acquire 占用的并发名额，根据结果调整该密钥的并发上限，并唤醒等待的请求
+
+        Args:
+            api_key: 使用的API密钥
+            seconds: 请求耗时
+            congested: 是否遇到限流、服务端错误、超时或连接失败
+        """
+        self.concurrency.release(api_key, seconds, congested)
+        with self._condition:
+            self._condition.notify_all()
+
+    def _next_waiter(self, limiter: KeyRateLimiter) -> Optional[_Waiter]:
+        """下一个应当拿到该限速器令牌的请求，调用时必须持有锁"""
+        best = None
+        best_order = None
+        for waiter in self._waiters:
+            if waiter.limiter is not limiter:
+                continue
+            order = (waiter.priority, self._last_served.get((waiter.priority, waiter.session_id), -1), waiter.seq)
+            if best_order is None or order < best_order:
+                best, best_order = waiter, order
+        return best
+
+    def waiting(self) -> Dict[str, int]:
+        """各优先级正在等待令牌的请求数"""
+        with self._condition:
+            counts = {name: 0 for name in PRIORITY_NAMES.values()}
+            for waiter in self._waiters:
+                counts[PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))] += 1
+            return counts
+
+
+_shared_scheduler: Optional[RequestScheduler] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_scheduler() -> RequestScheduler:
+    """进程内共享的请求调度器，网页上所有会话和后台任务使用同一个"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
@@ -0,0 +1,114 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class _Call:
+    """一次正在进行的调用"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用
+
+    同一个键同时只会执行一次，其余调用方等待这次执行结束并共享其结果（或异常）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        执行调用，若相同键的调用正在进行则等待其结果
+
+        Args:
+            key: 调用的键
+            fn: 实际执行的函数
+
+        Returns:
+            fn 的返回值
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def do_many(self, keys: List[Hashable], fn: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """
+        一次执行多个键的调用，已有相同键的调用正在进行时等待其结果，不再重复执行
+
+        Args:
+            keys: 调用的键列表
+            fn: 实际执行的函数，参数为没有进行中调用的键，返回 {键: 结果}，缺少的键结果为None
+
+        Returns:
+            {键: 结果} 字典，包含 keys 中的全部键
+        """
+        leading: Dict[Hashable, _Call] = {}
+        waiting: Dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in keys:
+                if key in leading or key in waiting:
+                    continue
+                call = self._calls.get(key)
+                if call is None:
+                    call = _Call()
+                    self._calls[key] = call
+                    leading[key] = call
+                else:
+                    waiting[key] = call
+
+        results: Dict[Hashable, Any] = {}
+        if leading:
+            try:
+                produced = fn(list(leading))
+                for key, call in leading.items():
+                    call.result = produced.get(key)
+                    results[key] = call.result
+            except Exception as e:
+                for call in leading.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in leading:
+                        del self._calls[key]
+                for call in leading.values():
+                    call.done.set()
+
+        for key, call in waiting.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.result
+        return results
+
+
+# 进程内共享的实例，Streamlit 中不同会话的相同查询也会被合并
+shared_flight = SingleFlight()
@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import config
+
+# 按型号前几个字符统计未找到的比例
+PREFIX_LENGTH = 3
+# 前缀统计样本较少时向全局比例收缩的权重
+PRIOR_WEIGHT = 4.0
+
+
+class MissPredictor:
+    """
+    根据历史查询结果估计一个型号精确搜索找不到的概率
+
+    同一型号以最近一次精确搜索的结果为准；没有记录的型号使用同前缀型号的
+    未找到比例，样本较少时向全局比例收缩。估计结果用于决定是否提前并行发起相似型号搜索。
+    """
+
+    def __init__(self, max_parts: Optional[int] = None):
+        self.max_parts = max_parts if max_parts is not None else config.MISS_HISTORY_SIZE
+        self._lock = threading.Lock()
+        # 型号 -> 最近一次精确搜索是否未找到
+        self._parts: "OrderedDict[str, bool]" = OrderedDict()
+        # 前缀 -> [未找到次数, 总次数]
+        self._prefixes: Dict[str, List[int]] = {}
+        self._misses = 0
+        self._total = 0
+
+    @staticmethod
+    def _key(part_number: str) -> str:
+        return part_number.strip().upper()
+
+    def record(self, part_number: str, found: bool):
+        """
+        记录一次精确搜索的结果
+
+        Args:
+            part_number: 电子元器件型号
+            found: 是否找到
+        """
+        key = self._key(part_number)
+        missed = not found
+        with self._lock:
+            self._parts[key] = missed
+            self._parts.move_to_end(key)
+            while len(self._parts) > self.max_parts:
+                self._parts.popitem(last=False)
+
+            stats = self._prefixes.setdefault(key[:PREFIX_LENGTH], [0, 0])
+            stats[0] += missed
+            stats[1] += 1
+            self._misses += missed
+            self._total += 1
+
+    def miss_probability(self, part_number: str) -> float:
+        """
+        估计精确搜索找不到的概率
+
+        Args:
+            part_number: 电子元器件型号
+
+        Returns:
+            0到1之间的概率，没有任何历史时为0
+        """
+        key = self._key(part_number)
+        with self._lock:
+            if key in self._parts:
+                return 1.0 if self._parts[key] else 0.0
+            if self._total == 0:
+                return 0.0
+            global_rate = self._misses / self._total
+            misses, total = self._prefixes.get(key[:PREFIX_LENGTH], (0, 0))
+            return (misses + PRIOR_WEIGHT * global_rate) / (total + PRIOR_WEIGHT)
+
+    def likely_miss(self, part_number: str, threshold: Optional[float] = None) -> bool:
+        """判断是否值得提前发起相似型号搜索"""
+        if threshold is None:
+            threshold = config.SPECULATIVE_MISS_THRESHOLD
+        return self.miss_probability(part_number) >= threshold
+
+
+# 进程内共享的历史结果，不同会话和批次的查询互相参考
+shared_miss_predictor = MissPredictor()
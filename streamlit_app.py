@@ -1,14 +1,29 @@
 import streamlit as st
 import pandas as pd
 from io import BytesIO
+from itertools import chain
+import hashlib
 import sys
 import os
+import time
+import uuid
 
 # 添加项目路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from mouser_api import MouserAPI
+from background_jobs import BackgroundJobRunner, STATUS_DONE
 from excel_handler import ExcelHandler
+from response_cache import ResponseCache
+from fuzzy_index import PartIndex
+from hot_set import HotSet
+from job_journal import JobJournal, JOB_RUNNING
+from key_health import KeyHealth
+from bom_costing import bom_currency, cost_matrix, parse_build_quantities, price_table_from_results
+from metrics import shared_metrics
+from refresher import BackgroundRefresher
+from scheduler import PRIORITY_BACKGROUND, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+import config
 
 # 页面配置
 st.set_page_config(
@@ -20,6 +35,60 @@ st.set_page_config(
 # 初始化处理器
 excel_handler = ExcelHandler()
 
+
+@st.cache_resource
+def get_response_cache():
+    """所有会话共享的本地响应缓存"""
+    return ResponseCache()
+
+
+@st.cache_resource
+def get_part_index():
+    """所有会话共享的已知型号索引，相似型号优先在本地查找"""
+    return PartIndex()
+
+
+@st.cache_resource
+def get_hot_set():
+    """所有会话共享的常用型号集合，记录查询频率供后台刷新使用"""
+    return HotSet()
+
+
+@st.cache_resource
+def get_job_journal():
+    """所有会话共享的任务日志，页面刷新后可以续跑未完成的任务"""
+    return JobJournal()
+
+
+@st.cache_resource
+def get_job_runner():
+    """所有会话共享的后台任务池，查询不会因为脚本重新运行而中断"""
+    return BackgroundJobRunner()
+
+
+@st.cache_resource
+def start_metrics_server():
+    """配置了端口时启动 /metrics 接口，整个进程只启动一次"""
+    if config.METRICS_PORT:
+        return shared_metrics.start_http_server(config.METRICS_PORT)
+    return None
+
+
+@st.cache_resource
+def start_refresher():
+    """配置了 REFRESH_IN_APP 时在网页进程内启动后台刷新，与使用相同密钥的查询共享调度器"""
+    if not config.REFRESH_IN_APP or not config.MOUSER_API_KEYS:
+        return None
+    mouser_api = MouserAPI(config.MOUSER_API_KEYS, cache=get_response_cache(), part_index=get_part_index(),
+                           priority=PRIORITY_BACKGROUND)
+    refresher = BackgroundRefresher(mouser_api, get_hot_set())
+    refresher.start()
+    return refresher
+
+
+start_metrics_server()
+start_refresher()
+
 # 页面标题
 st.title("🔍 贸泽电子元器件价格爬虫")
 
@@ -43,6 +112,25 @@ st.sidebar.markdown("""
 4. 查看和导出结果
 """)
 
+# 运行指标
+with st.sidebar.expander("运行指标"):
+    snapshot = shared_metrics.snapshot()
+    col_fallback, col_cache = st.columns(2)
+    col_fallback.metric("相似型号回退率", f"{snapshot['fallback_rate']:.1%}")
+    col_cache.metric("缓存命中率", f"{snapshot['cache_hit_rate']:.1%}")
+    col_retry, col_throttled = st.columns(2)
+    col_retry.metric("重试次数", snapshot["retries"])
+    col_throttled.metric("429次数", snapshot["throttled"])
+    if snapshot["keys"]:
+        st.dataframe(pd.DataFrame([{
+            "密钥": key["key"],
+            "请求数": key["requests"],
+            "p50(秒)": key["p50_seconds"],
+            "p99(秒)": key["p99_seconds"],
+            "今日剩余": key["tokens_today"],
+            "并发上限": key["concurrency_limit"]
+        } for key in snapshot["keys"]]), use_container_width=True, hide_index=True)
+
 # 主界面
 tab1, tab2, tab3 = st.tabs(["单个查询", "批量查询", "文件上传"])
 
@@ -83,11 +171,6 @@ if st.button("🔍 搜索价格", type="primary"):
     if not api_key:
         st.error("请提供Mouser API密钥")
     else:
-        # 初始化API
-        mouser_api = MouserAPI()
-        # 覆盖API密钥
-        mouser_api.api_keys = [api_key]
-        
         # 收集所有要搜索的元件型号
         components = []
         
@@ -100,180 +183,140 @@ if st.button("🔍 搜索价格", type="primary"):
             batch_list = [line.strip() for line in batch_components.split('\n') if line.strip()]
             components.extend(batch_list)
         
-        # 添加文件中的元件
+        # 文件中的元件不预先读出，后台任务执行时直接从上传的文件内容逐行读取，不写临时文件
+        file_components = []
+        file_digest = []
         if uploaded_file is not None:
-            try:
-                filename = uploaded_file.name
-                if filename.endswith('.xlsx'):
-                    # 保存临时文件
-                    temp_path = f"temp_{filename}"
-                    with open(temp_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    file_components = excel_handler.read_components_from_excel(temp_path)
-                    os.remove(temp_path)  # 清理临时文件
-                elif filename.endswith('.txt'):
-                    # 保存临时文件
-                    temp_path = f"temp_{filename}"
-                    with open(temp_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    file_components = excel_handler.read_components_from_txt(temp_path)
-                    os.remove(temp_path)  # 清理临时文件
-                else:
-                    st.error("不支持的文件格式，请使用.xlsx或.txt文件")
-                    st.stop()
-                components.extend(file_components)
-            except Exception as e:
-                st.error(f"读取文件时发生错误: {str(e)}")
+            filename = uploaded_file.name
+            file_data = uploaded_file.getvalue()
+            if filename.endswith('.xlsx'):
+                file_components = excel_handler.iter_components_from_excel(file_data)
+            elif filename.endswith('.txt'):
+                file_components = excel_handler.iter_components_from_txt(file_data)
+            else:
+                st.error("不支持的文件格式，请使用.xlsx或.txt文件")
                 st.stop()
+            # 与命令行相同，用文件内容的摘要代替型号列表生成任务ID
+            file_digest = [hashlib.sha1(file_data).hexdigest()]
         
-        if not components:
+        if not components and uploaded_file is None:
             st.warning("请至少输入一个元件型号")
         else:
-            # 显示进度
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            # 使用用户提供的API密钥初始化API，少量手动输入的元件作为交互查询优先执行，上传的文件按批量查询处理，
+            # 同一优先级的多个会话轮流使用令牌
+            interactive = uploaded_file is None and len(components) <= config.INTERACTIVE_MAX_COMPONENTS
+            priority = PRIORITY_INTERACTIVE if interactive else PRIORITY_BATCH
+            session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+            mouser_api = MouserAPI([api_key], cache=get_response_cache(), part_index=get_part_index(),
+                                   priority=priority, session_id=session_id, hot_set=get_hot_set())
             
-            # 搜索元件
-            results = []
-            total_components = len(components)
+            # 同一密钥下相同的元件列表对应同一个任务，上次中断的任务会跳过已完成的行；
+            # 使用其他密钥的会话不会接上这个任务
+            journal = get_job_journal()
+            job_id = JobJournal.make_job_id(components + file_digest, namespace=KeyHealth.key_id(api_key))
+            if journal.job_status(job_id) == JOB_RUNNING:
+                st.info("检测到上次未完成的相同查询，将跳过已完成的元件继续查询")
             
-            for i, component in enumerate(components):
-                try:
-                    # 更新进度
-                    progress = (i + 1) / total_components
-                    progress_bar.progress(progress)
-                    status_text.text(f"正在搜索: {component} ({i+1}/{total_components})")
-                    
-                    # 搜索元件
-                    part_data = mouser_api.search_part(component)
-                    
-                    if part_data:
-                        # 提取价格信息
-                        price, quantity = mouser_api.extract_pricing_info(part_data)
-                        
-                        # 检查是否停产
-                        is_discontinued = mouser_api.is_discontinued(part_data)
-                        
-                        # 获取替代型号
-                        replacement_part = mouser_api.get_replacement_part(part_data)
-                        
-                        # 设置备注信息
-                        if is_discontinued and price == 0:
-                            remark = "已停产无价格"
-                        elif is_discontinued:
-                            remark = "已停产"
-                        elif price == 0:
-                            remark = "无价格信息"
-                        else:
-                            remark = ""
-                        
-                        result = {
-                            "元件型号": component,
-                            "搜索型号": component,
-                            "产品名称": part_data.get("ManufacturerPartNumber", ""),
-                            "品牌": part_data.get("Manufacturer", ""),
-                            "价格": price,
-                            "最大批次": quantity,
-                            "库存": part_data.get("Availability", ""),
-                            "是否停产": "是" if is_discontinued else "否",
-                            "替代型号": replacement_part,
-                            "备注": remark
-                        }
-                    else:
-                        # 尝试搜索相似型号
-                        similar_part_data = mouser_api.search_similar_part(component)
-                        if similar_part_data:
-                            # 提取价格信息
-                            price, quantity = mouser_api.extract_pricing_info(similar_part_data)
-                            
-                            # 检查是否停产
-                            is_discontinued = mouser_api.is_discontinued(similar_part_data)
-                            
-                            # 获取替代型号
-                            replacement_part = mouser_api.get_replacement_part(similar_part_data)
-                            
-                            # 设置备注信息
-                            if is_discontinued and price == 0:
-                                remark = "已停产无价格"
-                            elif is_discontinued:
-                                remark = "已停产"
-                            elif price == 0:
-                                remark = "无价格信息"
-                            else:
-                                remark = "相似型号爬取"
-                            
-                            result = {
-                                "元件型号": component,
-                                "搜索型号": similar_part_data.get("ManufacturerPartNumber", ""),
-                                "产品名称": similar_part_data.get("ManufacturerPartNumber", ""),
-                                "品牌": similar_part_data.get("Manufacturer", ""),
-                                "价格": price,
-                                "最大批次": quantity,
-                                "库存": similar_part_data.get("Availability", ""),
-                                "是否停产": "是" if is_discontinued else "否",
-                                "替代型号": replacement_part,
-                                "备注": remark
-                            }
-                        else:
-                            result = {
-                                "元件型号": component,
-                                "搜索型号": "",
-                                "产品名称": "",
-                                "品牌": "",
-                                "价格": 0,
-                                "最大批次": 0,
-                                "库存": "",
-                                "是否停产": "否",
-                                "替代型号": "",
-                                "备注": "未找到"
-                            }
-                    
-                    results.append(result)
-                    
-                except Exception as e:
-                    error_result = {
-                        "元件型号": component,
-                        "搜索型号": "",
-                        "产品名称": "",
-                        "品牌": "",
-                        "价格": 0,
-                        "最大批次": 0,
-                        "库存": "",
-                        "是否停产": "否",
-                        "替代型号": "",
-                        "备注": f"错误: {str(e)}"
-                    }
-                    results.append(error_result)
+            # 提交到后台执行，页面只记录任务ID并轮询进度
+            get_job_runner().submit(job_id, mouser_api, chain(components, file_components), journal)
+            st.session_state["job_id"] = job_id
+            st.session_state.pop("results", None)
+            st.session_state.pop("results_job_id", None)
+
+# 后台任务进度
+job_id = st.session_state.get("job_id")
+job = get_job_runner().get(job_id) if job_id else None
+if job is not None and not job.finished:
+    # 上传的文件边读边查，读完之前总数未知
+    if job.total is not None:
+        st.progress(job.completed / max(job.total, 1))
+        st.text(f"已完成: {job.current} ({job.completed}/{job.total})")
+    else:
+        st.text(f"已完成: {job.current} ({job.completed})")
+    
+    # 逐步显示已完成的部分结果
+    partial_results = job.partial_results()
+    if partial_results:
+        st.dataframe(pd.DataFrame([result.to_display_row() for result in partial_results]),
+                     use_container_width=True)
+elif job is not None and st.session_state.get("results_job_id") != job.job_id:
+    # 任务结束后把结果保存在会话中，之后重新运行脚本不会再查询
+    st.session_state["results_job_id"] = job.job_id
+    if job.status == STATUS_DONE:
+        st.session_state["results"] = job.results
+        st.success(f"搜索完成，共处理 {job.total} 个元件")
+    else:
+        st.error(f"搜索时发生错误: {job.error}")
+
+# 显示结果
+results = st.session_state.get("results")
+if results is not None:
+    if results:
+        # 只在显示时转换为中文列名
+        df = pd.DataFrame([result.to_display_row() for result in results])
+        
+        # 显示结果表格
+        st.subheader("查询结果")
+        st.dataframe(df, use_container_width=True)
+        
+        # 导出结果
+        st.subheader("导出结果")
+        
+        # 创建Excel文件在内存中
+        output = BytesIO()
+        excel_handler.create_result_template(results, output)
+        output.seek(0)
+        
+        st.download_button(
+            label="📥 导出为Excel",
+            data=output,
+            file_name="贸泽电子元件价格查询结果.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        
+        # 根据已保存的价格阶梯计算不同生产数量下的BOM成本，不重新查询
+        st.subheader("BOM成本测算")
+        build_text = st.text_input("生产数量（用逗号分隔，支持k/w表示千/万）", value="100, 1k, 10k")
+        try:
+            build_quantities = parse_build_quantities(build_text)
+        except ValueError:
+            build_quantities = []
+            st.error("生产数量格式不正确")
+        
+        price_table = price_table_from_results(results)
+        try:
+            # 总价按各行的货币标注，不同货币不能直接相加
+            currency = bom_currency(price_table)
+        except ValueError as e:
+            build_quantities = []
+            st.error(str(e))
+        
+        if build_quantities:
+            unit = f"({currency})" if currency else ""
+            _, line_costs = cost_matrix(price_table, build_quantities)
+            totals = line_costs.sum(axis=0)
             
-            progress_bar.empty()
-            status_text.empty()
-            st.success(f"搜索完成，共处理 {total_components} 个元件")
+            st.dataframe(pd.DataFrame({
+                "生产数量": build_quantities,
+                f"BOM总价{unit}": totals,
+                f"单套成本{unit}": totals / build_quantities
+            }), use_container_width=True)
             
-            # 显示结果
-            if results:
-                df = pd.DataFrame(results)
-                
-                # 显示结果表格
-                st.subheader("查询结果")
-                st.dataframe(df, use_container_width=True)
-                
-                # 导出结果
-                st.subheader("导出结果")
-                
-                # 创建Excel文件在内存中
-                output = BytesIO()
-                excel_handler.create_result_template(results, output)
-                output.seek(0)
-                
-                st.download_button(
-                    label="📥 导出为Excel",
-                    data=output,
-                    file_name="贸泽电子元件价格查询结果.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-            else:
-                st.info("没有找到任何结果")
+            cost_df = pd.DataFrame(line_costs, columns=[f"{quantity}套金额{unit}" for quantity in build_quantities])
+            cost_df.insert(0, "元件型号", [result.component for result in results])
+            st.dataframe(cost_df, use_container_width=True)
+            
+            unpriced = sum(1 for result in results if not result.price_breaks)
+            if unpriced:
+                st.warning(f"有 {unpriced} 个元件没有价格信息，未计入成本")
+    else:
+        st.info("没有找到任何结果")
 
 # 页脚
 st.markdown("---")
-st.markdown("© 2025 贸泽电子元器件价格爬虫工具")
\ No newline at end of file
+st.markdown("© 2025 贸泽电子元器件价格爬虫工具")
+
+# 任务未结束时定时刷新页面以更新进度
+if job is not None and not job.finished:
+    time.sleep(config.JOB_POLL_INTERVAL)
+    st.rerun()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_engine import AsyncLookupEngine
+from result_record import PartResult
+
+
+class FakeMouserAPI:
+    """按输入返回预设结果，lm358n 是相似型号匹配"""
+
+    def reserve_connections(self, concurrency):
+        pass
+
+    def lookup_components(self, components):
+        rows = []
+        for component in components:
+            searched_part = "LM358NG" if component.upper().startswith("LM358N") else component
+            rows.append(PartResult(component, searched_part=searched_part, manufacturer="TI", price=1.0))
+        return rows
+
+
+def test_duplicates_keep_their_own_spelling_for_exact_matches():
+    engine = AsyncLookupEngine(FakeMouserAPI(), max_concurrency=1, batch_size=10)
+
+    rows = engine.run(["LM358DR", "lm358dr", "LM358N", " lm358n"])
+
+    assert [(row.component, row.searched_part) for row in rows] == [
+        ("LM358DR", "LM358DR"),
+        ("lm358dr", "lm358dr"),
+        ("LM358N", "LM358NG"),
+        (" lm358n", "LM358NG"),
+    ]
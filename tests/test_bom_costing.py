@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bom_costing import bom_currency, cost_matrix, price_table_from_results, unit_prices
+from result_record import PartResult
+
+
+def make_results(*lines):
+    return [PartResult(f"P{index}", price_breaks=tiers, currency=currency)
+            for index, (tiers, currency) in enumerate(lines)]
+
+
+def test_unit_prices_below_minimum_tier_and_without_price():
+    table = price_table_from_results(make_results(
+        ([(10, 2.0), (100, 1.5), (1000, 1.0)], "CNY"),
+        ([], ""),
+        ([(1, 0.3)], "CNY"),
+    ))
+
+    prices = unit_prices(table, np.array([[1, 10, 99, 5000]] * 3))
+
+    assert prices.tolist() == [
+        [2.0, 2.0, 2.0, 1.0],
+        [0.0, 0.0, 0.0, 0.0],
+        [0.3, 0.3, 0.3, 0.3],
+    ]
+
+
+def test_cost_matrix_scales_by_line_quantity():
+    table = price_table_from_results(make_results(
+        ([(1, 1.0), (100, 0.5)], "CNY"),
+        ([], ""),
+    ))
+
+    prices, costs = cost_matrix(table, [10, 100], line_quantities=[10, 3])
+
+    assert prices.tolist() == [[0.5, 0.5], [0.0, 0.0]]
+    assert costs.tolist() == [[50.0, 500.0], [0.0, 0.0]]
+    with pytest.raises(ValueError):
+        cost_matrix(table, [10], line_quantities=[1])
+
+
+def test_bom_currency_ignores_unpriced_lines_and_rejects_mixed_currencies():
+    assert bom_currency(price_table_from_results(make_results(([(1, 1.0)], "USD"), ([], "")))) == "USD"
+    assert bom_currency(price_table_from_results(make_results(([(1, 1.0)], "")))) == ""
+    with pytest.raises(ValueError):
+        bom_currency(price_table_from_results(make_results(([(1, 1.0)], "CNY"), ([(1, 1.0)], "USD"))))
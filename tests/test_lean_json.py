@@ -0,0 +1,30 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lean_json import compact_part, decode_search_response
+from pricing import PriceTable
+
+
+def test_compaction_keeps_single_price_fallback():
+    part = {"Price": "$1.50", "Min": "10", "PriceBreaks": [], "Description": "Op Amp"}
+    assert PriceTable.from_parts([compact_part(part)]).max_tier(0) == PriceTable.from_parts([part]).max_tier(0)
+
+
+def test_decode_drops_unused_fields():
+    part = {
+        "ManufacturerPartNumber": "LM358DR",
+        "Description": "Op Amp",
+        "ProductAttributes": [{"AttributeName": "Packaging", "AttributeValue": "Reel"}],
+        "PriceBreaks": [{"Quantity": 1, "Price": "¥2.50", "Currency": "CNY", "Extra": "x"}],
+    }
+    content = json.dumps({"Errors": [], "SearchResults": {"NumberOfResult": 1, "Parts": [part]}}).encode("utf-8")
+
+    data = decode_search_response(content)
+
+    assert data["SearchResults"]["Parts"] == [{
+        "ManufacturerPartNumber": "LM358DR",
+        "PriceBreaks": [{"Quantity": 1, "Price": "¥2.50", "Currency": "CNY"}],
+    }]
@@ -0,0 +1,164 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from key_health import BREAKER_CLOSED, BREAKER_OPEN, KeyHealth
+from mouser_api import MouserAPI
+from scheduler import RequestScheduler
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.content = json.dumps(data if data is not None else {}).encode("utf-8")
+        self.headers = {}
+
+
+def make_api(api_keys, responses):
+    """用内存中的密钥状态和独立的调度器创建API，请求按密钥返回预设的响应"""
+    api = MouserAPI(api_keys, key_health=KeyHealth(":memory:"), scheduler=RequestScheduler())
+    calls = []
+
+    def post(url, json=None, timeout=None):
+        api_key = url.split("apiKey=", 1)[1]
+        calls.append(api_key)
+        return responses[api_key]
+
+    api.session.post = post
+    return api, calls
+
+
+@pytest.mark.parametrize("status_code", [401, 403])
+def test_rejected_key_opens_breaker_and_rotates(status_code):
+    part = {"ManufacturerPartNumber": "LM358DR", "MouserPartNumber": "595-LM358DR", "PriceBreaks": []}
+    api, calls = make_api(["dead", "good"], {
+        "dead": FakeResponse(status_code),
+        "good": FakeResponse(200, {"Errors": [], "SearchResults": {"NumberOfResult": 1, "Parts": [part]}}),
+    })
+    # 让失效的密钥先被选中
+    api.rate_limiter._buckets["good"][0].tokens -= 1
+
+    part_data = api.search_part("LM358DR")
+
+    assert part_data["ManufacturerPartNumber"] == "LM358DR"
+    assert calls == ["dead", "good"]
+    assert api.key_health.states(["dead", "good"]) == {"dead": BREAKER_OPEN, "good": BREAKER_CLOSED}
+    assert not api.key_health.breaker("dead").can_use()
+
+
+def test_long_retry_after_opens_breaker_instead_of_sleeping(monkeypatch):
+    part = {"ManufacturerPartNumber": "LM358DR", "MouserPartNumber": "595-LM358DR", "PriceBreaks": []}
+    throttled = FakeResponse(429)
+    throttled.headers = {"Retry-After": "600"}
+    api, calls = make_api(["slow", "good"], {
+        "slow": throttled,
+        "good": FakeResponse(200, {"Errors": [], "SearchResults": {"NumberOfResult": 1, "Parts": [part]}}),
+    })
+    api.rate_limiter._buckets["good"][0].tokens -= 1
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+
+    part_data = api.search_part("LM358DR")
+
+    assert part_data["ManufacturerPartNumber"] == "LM358DR"
+    assert calls == ["slow", "good"]
+    assert sleeps == []
+    breaker = api.key_health.breaker("slow")
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.opened_until - time.monotonic() > api.retry_policy.backoff_max
+
+
+def test_overlapping_batches_share_in_flight_requests():
+    api = MouserAPI(["k1"], key_health=KeyHealth(":memory:"), scheduler=RequestScheduler())
+    requested = []
+    lock = threading.Lock()
+
+    def post(url, json=None, timeout=None):
+        part_numbers = json["SearchByPartRequest"]["mouserPartNumber"].split("|")
+        with lock:
+            requested.extend(part_numbers)
+        time.sleep(0.2)
+        parts = [{"ManufacturerPartNumber": part_number, "MouserPartNumber": "595-" + part_number}
+                 for part_number in part_numbers]
+        return FakeResponse(200, {"Errors": [], "SearchResults": {"NumberOfResult": len(parts), "Parts": parts}})
+
+    api.session.post = post
+    results = {}
+
+    def search(name, part_numbers):
+        results[name] = api.search_parts(part_numbers)
+
+    first = threading.Thread(target=search, args=("first", ["LM358DR", "NE555P"]))
+    first.start()
+    time.sleep(0.05)
+    search("second", ["ne555p", "TL072CDR"])
+    first.join()
+
+    assert sorted(requested) == ["LM358DR", "NE555P", "TL072CDR"]
+    assert results["second"]["ne555p"]["ManufacturerPartNumber"] == "NE555P"
+    assert results["first"]["LM358DR"]["ManufacturerPartNumber"] == "LM358DR"
+
+
+def test_instances_share_adaptive_limit_and_connection_errors_back_off():
+    scheduler = RequestScheduler()
+    health = KeyHealth(":memory:")
+    first = MouserAPI(["k1"], key_health=health, scheduler=scheduler)
+    second = MouserAPI(["k1"], key_health=health, scheduler=scheduler)
+
+    def post(url, json=None, timeout=None):
+        raise requests.ConnectionError("connection refused")
+
+    first.session.post = post
+    before = second.concurrency.limit("k1")
+    with pytest.raises(requests.ConnectionError):
+        first._send(first._get_next_api_key(), {})
+
+    assert first.concurrency is second.concurrency
+    assert second.concurrency.limit("k1") < before
+
+
+def test_key_selection_skips_keys_without_concurrency_headroom():
+    scheduler = RequestScheduler()
+    limiter = scheduler.rate_limiter(["busy", "idle"], KeyHealth(":memory:"))
+    # idle 的令牌更少，但 busy 的并发名额已经用完
+    assert limiter.try_acquire(lambda api_key: api_key == "idle") == "idle"
+    while scheduler.concurrency.try_acquire("busy"):
+        pass
+
+    assert scheduler.acquire(limiter) == "idle"
+
+    scheduler.release("busy", 0.1, congested=False)
+    assert scheduler.acquire(limiter) == "busy"
+
+
+def test_single_and_batched_exact_search_agree_on_suffixed_part_numbers():
+    options = []
+
+    def make(api_keys):
+        api = MouserAPI(api_keys, key_health=KeyHealth(":memory:"), scheduler=RequestScheduler())
+
+        def post(url, json=None, timeout=None):
+            request = json["SearchByPartRequest"]
+            options.append(request["partSearchOptions"])
+            # Mouser精确搜索返回带包装后缀的型号
+            parts = [{"ManufacturerPartNumber": part_number + "G4", "MouserPartNumber": "595-" + part_number + "G4"}
+                     for part_number in request["mouserPartNumber"].split("|")]
+            return FakeResponse(200, {"Errors": [], "SearchResults": {"NumberOfResult": len(parts), "Parts": parts}})
+
+        api.session.post = post
+        return api
+
+    single = make(["k1"]).lookup_component("OPA2134UA")
+    batched = make(["k1"]).lookup_components(["OPA2277UA", "OPA2134UA"])
+
+    assert single.product_name == "OPA2134UAG4"
+    assert [row.product_name for row in batched] == ["OPA2277UAG4", "OPA2134UAG4"]
+    assert all(row.searched_part == row.component for row in [single] + batched)
+    assert "PartialMatch" not in options
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import PriceTable, parse_price
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("¥1,234.50", 1234.5),
+    ("$0.123", 0.123),
+    ("1.234,56 €", 1234.56),
+    ("0,123 €", 0.123),
+    ("12,5", 12.5),
+    ("1,234", 1234.0),
+    ("1,234,567", 1234567.0),
+    (3, 3.0),
+    (0.5, 0.5),
+])
+def test_parse_price_separators(text, expected):
+    assert parse_price(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text", [None, "", "N/A"])
+def test_parse_price_without_number(text):
+    assert parse_price(text) is None
+
+
+def test_price_table_sorts_tiers_and_keeps_currency():
+    table = PriceTable.from_parts([
+        {"PriceBreaks": [
+            {"Quantity": 100, "Price": "¥1.96", "Currency": "CNY"},
+            {"Quantity": 1, "Price": "¥3.52", "Currency": "CNY"},
+        ]},
+        {"Price": "$0.50", "Min": "10"},
+        None,
+    ])
+
+    assert table.tiers(0) == [(1, 3.52), (100, 1.96)]
+    assert table.currency(0) == "CNY"
+    assert table.tiers(1) == [(10, 0.5)]
+    assert table.currency(1) == "USD"
+    assert table.tiers(2) == []
+    assert table.max_tier(2) == (0.0, 0)
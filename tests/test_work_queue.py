@@ -0,0 +1,65 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from work_queue import SHARD_DONE, SHARD_FAILED, SHARD_LEASED, SHARD_PENDING, WorkQueue
+
+
+def make_queue(tmp_path, max_attempts=3):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=max_attempts)
+    queue.enqueue("job", ["A", "B", "C"], shard_size=2)
+    return queue
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.claim("w1", lease_seconds=0)
+
+    assert queue.requeue_expired() == 1
+    second = queue.claim("w2", lease_seconds=60)
+
+    assert (second.shard_index, second.components) == (first.shard_index, ["A", "B"])
+    assert second.lease_token != first.lease_token
+    assert not queue.renew(first)
+
+
+def test_complete_with_lost_lease_leaves_shard_to_new_holder(tmp_path):
+    queue = make_queue(tmp_path)
+    stale = queue.claim("w1", lease_seconds=0)
+    current = queue.claim("w2", lease_seconds=60)
+    assert current.shard_index == stale.shard_index
+
+    assert not queue.complete(stale)
+    assert queue.progress("job")[SHARD_LEASED] == 1
+
+    assert queue.complete(current)
+    assert queue.progress("job")[SHARD_DONE] == 1
+
+
+def test_release_without_counting_attempt_keeps_shard_claimable(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1)
+    shard = queue.claim("w1", job_id="job")
+
+    queue.release(shard, count_attempt=False)
+    assert queue.progress("job")[SHARD_PENDING] == 2
+
+    shard = queue.claim("w1", job_id="job")
+    queue.release(shard)
+    assert queue.progress("job")[SHARD_FAILED] == 1
+
+
+def test_last_shard_failing_finishes_job_and_can_be_reset(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1)
+    assert queue.complete(queue.claim("w1"))
+    queue.release(queue.claim("w1"))
+
+    assert queue.job_finished("job")
+    assert queue.progress("job") == {SHARD_PENDING: 0, SHARD_LEASED: 0, SHARD_DONE: 1, SHARD_FAILED: 1}
+
+    assert queue.reset_failed("job") == 1
+    assert not queue.job_finished("job")
+    shard = queue.claim("w2")
+    assert shard.components == ["C"]
+    assert queue.complete(shard)
+    assert queue.job_finished("job")
@@ -0,0 +1,305 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import config
+from typing import Dict, Iterable, List, Optional
+
+# 分片状态
+SHARD_PENDING = "pending"
+SHARD_LEASED = "leased"
+SHARD_DONE = "done"
+SHARD_FAILED = "failed"
+
+
+class LeaseLostError(RuntimeError):
+    """分片租约已过期并被其他进程重新领取"""
+
+
+class Shard:
+    """一个已被领取的分片"""
+
+    def __init__(self, job_id: str, shard_index: int, start_position: int, components: List[str],
+                 lease_token: str):
+        self.job_id = job_id
+        self.shard_index = shard_index
+        self.start_position = start_position
+        self.components = components
+        self.lease_token = lease_token
+
+    def __repr__(self) -> str:
+        return f"Shard({self.job_id!r}, {self.shard_index}, {len(self.components)} 个元件)"
+
+
+class WorkQueue:
+    """
+    本地持久化的分片任务队列（SQLite）
+
+    输入按 shard_size 切分成分片写入队列，多个工作进程（可以在共享同一数据库文件的不同主机上）
+    各自领取分片并获得一段时间的租约。进程崩溃或超时未完成时租约过期，分片重新回到待领取状态，
+    尝试次数超过 max_attempts 的分片标记为失败，不再领取。
+    数据库使用 WORK_QUEUE_JOURNAL_MODE（默认回滚日志），WAL模式不能用于网络文件系统。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_attempts: Optional[int] = None):
+        self.db_path = db_path if db_path is not None else config.WORK_QUEUE_PATH
+        self.max_attempts = max_attempts if max_attempts is not None else config.WORK_QUEUE_MAX_ATTEMPTS
+        self._lock = threading.Lock()
+        # 多个进程同时写入时等待锁释放，而不是立即报错
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(f"PRAGMA journal_mode={config.WORK_QUEUE_JOURNAL_MODE}")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS queue_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    component_count INTEGER NOT NULL,
+                    shard_count INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS queue_shards (
+                    job_id TEXT NOT NULL,
+                    shard_index INTEGER NOT NULL,
+                    start_position INTEGER NOT NULL,
+                    components_json TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker_id TEXT,
+                    lease_token TEXT,
+                    lease_expires_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (job_id, shard_index)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_queue_shards_status ON queue_shards (status)")
+
+    def enqueue(self, job_id: str, components: Iterable[str], shard_size: Optional[int] = None) -> int:
+        """
+        将输入切分成分片写入队列，同一任务ID已存在时不重复写入
+
+        Args:
+            job_id: 任务ID
+            components: 元件型号序列，按需逐行读取
+            shard_size: 每个分片的元件数量
+
+        Returns:
+            任务的分片数量
+        """
+        shard_size = max(1, shard_size if shard_size is not None else config.WORK_QUEUE_SHARD_SIZE)
+        with self._lock:
+            row = self._conn.execute("SELECT shard_count FROM queue_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is not None:
+            return row[0]
+
+        shard_index = 0
+        position = 0
+        chunk: List[str] = []
+        with self._lock, self._conn:
+            for component in components:
+                chunk.append(component)
+                if len(chunk) >= shard_size:
+                    self._insert_shard(job_id, shard_index, position, chunk)
+                    shard_index += 1
+                    position += len(chunk)
+                    chunk = []
+            if chunk:
+                self._insert_shard(job_id, shard_index, position, chunk)
+                shard_index += 1
+                position += len(chunk)
+            self._conn.execute(
+                "INSERT INTO queue_jobs VALUES (?, ?, ?, ?)", (job_id, position, shard_index, time.time())
+            )
+        return shard_index
+
+    def _insert_shard(self, job_id: str, shard_index: int, start_position: int, components: List[str]):
+        self._conn.execute(
+            "INSERT INTO queue_shards (job_id, shard_index, start_position, components_json, status) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (job_id, shard_index, start_position, json.dumps(components, ensure_ascii=False), SHARD_PENDING),
+        )
+
+    def claim(self, worker_id: str, lease_seconds: Optional[float] = None,
+              job_id: Optional[str] = None) -> Optional[Shard]:
+        """
+        领取一个待处理或租约已过期的分片
+
+        Args:
+            worker_id: 工作进程标识
+            lease_seconds: 租约时长(秒)
+            job_id: 只领取该任务的分片，默认领取任意任务
+
+        Returns:
+            领取到的分片，没有可领取的分片时返回None
+        """
+        lease_seconds = lease_seconds if lease_seconds is not None else config.WORK_QUEUE_LEASE_SECONDS
+        self.requeue_expired()
+
+        now = time.time()
+        token = uuid.uuid4().hex
+        job_filter = "AND job_id = ?" if job_id is not None else ""
+        params = [worker_id, token, now + lease_seconds, SHARD_LEASED, SHARD_PENDING]
+        if job_id is not None:
+            params.append(job_id)
+        with self._lock:
+            # 单条UPDATE语句在写锁内完成选择和领取，多个进程不会领到同一个分片
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE queue_shards SET worker_id = ?, lease_token = ?, lease_expires_at = ?, "
+                    "status = ?, attempts = attempts + 1 "
+                    "WHERE rowid = (SELECT rowid FROM queue_shards WHERE status = ? "
+                    f"{job_filter} ORDER BY job_id, shard_index LIMIT 1)",
+                    params,
+                )
+            row = self._conn.execute(
+                "SELECT job_id, shard_index, start_position, components_json FROM queue_shards "
+                "WHERE lease_token = ?",
+                (token,),
+            ).fetchone()
+        if row is None:
+            return None
+        return Shard(row[0], row[1], row[2], json.loads(row[3]), token)
+
+    def renew(self, shard: Shard, lease_seconds: Optional[float] = None) -> bool:
+        """
+        延长分片的租约，处理较慢时定期调用
+
+        Returns:
+            租约仍属于本进程时返回True
+        """
+        lease_seconds = lease_seconds if lease_seconds is not None else config.WORK_QUEUE_LEASE_SECONDS
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE queue_shards SET lease_expires_at = ? WHERE lease_token = ? AND status = ?",
+                (time.time() + lease_seconds, shard.lease_token, SHARD_LEASED),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, shard: Shard) -> bool:
+        """
+        将分片标记为完成
+
+        Returns:
+            租约仍属于本进程并已标记完成时返回True；租约已被其他进程重新领取时返回False，分片状态不变
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE queue_shards SET status = ?, lease_token = NULL, lease_expires_at = NULL "
+                "WHERE job_id = ? AND shard_index = ? AND lease_token = ? AND status = ?",
+                (SHARD_DONE, shard.job_id, shard.shard_index, shard.lease_token, SHARD_LEASED),
+            )
+        return cursor.rowcount > 0
+
+    def job_finished(self, job_id: str) -> bool:
+        """任务的全部分片都已结束（完成或失败）时返回True"""
+        with self._lock:
+            remaining = self._conn.execute(
+                "SELECT COUNT(*) FROM queue_shards WHERE job_id = ? AND status IN (?, ?)",
+                (job_id, SHARD_PENDING, SHARD_LEASED),
+            ).fetchone()[0]
+        return remaining == 0
+
+    def release(self, shard: Shard, count_attempt: bool = True):
+        """
+        处理失败时放弃租约，分片立即回到待领取状态
+
+        Args:
+            shard: 领取到的分片
+            count_attempt: 为False时不计入尝试次数，用于与分片本身无关的失败（如API密钥暂时不可用）
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE queue_shards SET status = ?, worker_id = NULL, lease_token = NULL, lease_expires_at = NULL, "
+                "attempts = attempts - ? WHERE lease_token = ? AND status = ?",
+                (SHARD_PENDING, 0 if count_attempt else 1, shard.lease_token, SHARD_LEASED),
+            )
+        self._fail_exhausted()
+
+    def requeue_expired(self) -> int:
+        """
+        将租约已过期的分片重新放回队列
+
+        Returns:
+            重新放回队列的分片数量
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE queue_shards SET status = ?, worker_id = NULL, lease_token = NULL, lease_expires_at = NULL "
+                "WHERE status = ? AND lease_expires_at <= ?",
+                (SHARD_PENDING, SHARD_LEASED, time.time()),
+            )
+        self._fail_exhausted()
+        return cursor.rowcount
+
+    def _fail_exhausted(self):
+        """尝试次数用尽的待领取分片标记为失败"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE queue_shards SET status = ? WHERE status = ? AND attempts >= ?",
+                (SHARD_FAILED, SHARD_PENDING, self.max_attempts),
+            )
+
+    def reset_failed(self, job_id: str) -> int:
+        """
+        将任务中失败的分片放回队列，尝试次数清零
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            放回队列的分片数量
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE queue_shards SET status = ?, worker_id = NULL, attempts = 0 WHERE job_id = ? AND status = ?",
+                (SHARD_PENDING, job_id, SHARD_FAILED),
+            )
+        return cursor.rowcount
+
+    def unfinished_count(self, job_id: Optional[str] = None) -> int:
+        """待领取和处理中的分片数量"""
+        job_filter = "AND job_id = ?" if job_id is not None else ""
+        params = [SHARD_PENDING, SHARD_LEASED] + ([job_id] if job_id is not None else [])
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM queue_shards WHERE status IN (?, ?) {job_filter}", params
+            ).fetchone()[0]
+
+    def job_ids(self) -> List[str]:
+        """队列中的全部任务ID，按创建时间排列"""
+        with self._lock:
+            rows = self._conn.execute("SELECT job_id FROM queue_jobs ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def progress(self, job_id: str) -> Dict[str, int]:
+        """
+        统计任务各状态的分片数量
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            {状态: 分片数量} 字典
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM queue_shards WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall()
+        counts = {SHARD_PENDING: 0, SHARD_LEASED: 0, SHARD_DONE: 0, SHARD_FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def delete_job(self, job_id: str):
+        """删除任务的全部分片"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM queue_shards WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM queue_jobs WHERE job_id = ?", (job_id,))
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()